@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseBroadcast:
+    """
+    Fan-out of chat events to connected clients.
+
+    ``publish`` may be called from any thread (sync views, signal handlers);
+    ``subscribe`` returns an async context manager that yields events for one
+    channel. Backends shared between processes (e.g. Redis pub/sub) implement
+    the same two methods and are selected with GROUP_CHAT_BROADCAST_BACKEND.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class Subscription:
+    max_pending = 100
+
+    def __init__(self, broadcast, channel):
+        self.broadcast = broadcast
+        self.channel = channel
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self.broadcast._add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broadcast._discard(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        # A client that stopped reading loses events rather than growing memory.
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+
+
+class InMemoryBroadcast(BaseBroadcast):
+    """Process-local broadcast, enough for a single ASGI worker and for tests."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        return Subscription(self, channel)
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.channel].add(subscription)
+
+    def _discard(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+@lru_cache(maxsize=None)
+def get_broadcast():
+    backend = getattr(settings, 'GROUP_CHAT_BROADCAST_BACKEND', 'apps.groups.broadcast.InMemoryBroadcast')
+    return import_string(backend)()
+
+
+# Key of the event published on a group's channel when a member leaves it.
+MEMBER_LEFT = 'member_left'
+
+
+def group_channel(group_id):
+    return f'group-{group_id}'
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import SyncToAsync
+from django.db import close_old_connections
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+from apps.users.authentication import ClaimsJWTAuthentication
+from .broadcast import MEMBER_LEFT, get_broadcast, group_channel
+from .models import Membership, Message
+
+GROUP_CHAT_PATH = re.compile(r'^/ws/groups/(?P<group_id>\d+)/$')
+
+# Application-level close codes (4000-4999 are reserved for applications).
+CLOSE_NOT_FOUND = 4004
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_FORBIDDEN = 4003
+
+
+class DatabaseSyncToAsync(SyncToAsync):
+    """
+    ``sync_to_async`` for ORM helpers. A socket outlives any request, so the
+    request signals that usually close stale connections never fire; this
+    closes them around each call instead, as Channels' ``database_sync_to_async`` does.
+    """
+
+    def thread_handler(self, loop, *args, **kwargs):
+        close_old_connections()
+        try:
+            return super().thread_handler(loop, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+
+database_sync_to_async = DatabaseSyncToAsync
+
+
+@database_sync_to_async
+def authenticate(raw_token):
+    authentication = ClaimsJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return None
+
+
+@database_sync_to_async
+def is_member(group_id, user):
+    return Membership.objects.filter(studygroup_id=group_id, user_id=user.id).exists()
+
+
+@database_sync_to_async
+def save_message(group_id, user, content):
+    """The saved message, or ``None`` if ``user`` has left the group since connecting."""
+    if not Membership.objects.filter(studygroup_id=group_id, user_id=user.id).exists():
+        return None
+    # Saving broadcasts the message to every subscriber, this socket included.
+    return Message.objects.create(group_id=group_id, sender=user, content=content)
+
+
+class GroupChatConsumer:
+    """
+    WebSocket endpoint for one study group's chat: ``/ws/groups/<id>/?token=<access>``.
+
+    Members receive every new message of the group as a JSON frame and may send
+    ``{"content": "..."}`` frames to post. The socket is closed with
+    ``CLOSE_FORBIDDEN`` once the user is no longer a member.
+    """
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+        user = await authenticate(token) if token else None
+        if user is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+            return
+        if not await is_member(self.group_id, user):
+            await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+            return
+
+        async with get_broadcast().subscribe(group_channel(self.group_id)) as subscription:
+            await send({'type': 'websocket.accept'})
+            tasks = [
+                asyncio.ensure_future(self.read_client(user, receive, send)),
+                asyncio.ensure_future(self.forward(user, subscription, send)),
+            ]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def read_client(self, user, receive, send):
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event['type'] != 'websocket.receive':
+                continue
+            try:
+                content = json.loads(event.get('text') or '{}').get('content', '').strip()
+            except (ValueError, AttributeError):
+                content = ''
+            if not content:
+                await self.send_json(send, {'error': 'Message content is required.'})
+            elif user.user_type != 'student':
+                await self.send_json(send, {'error': 'Only students can chat in groups.'})
+            elif await save_message(self.group_id, user, content) is None:
+                await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+                return
+
+    async def forward(self, user, subscription, send):
+        async for message in subscription:
+            if MEMBER_LEFT not in message:
+                await self.send_json(send, message)
+            elif message[MEMBER_LEFT] == user.id:
+                await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+                return
+
+    async def send_json(self, send, payload):
+        await send({'type': 'websocket.send', 'text': json.dumps(payload)})
+
+
+async def websocket_application(scope, receive, send):
+    match = GROUP_CHAT_PATH.match(scope['path'])
+    if match is None:
+        await receive()
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    await GroupChatConsumer(int(match['group_id']))(scope, receive, send)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_missing_created_at(apps, schema_editor):
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    StudyGroup.objects.filter(created_at__isnull=True).update(created_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_remove_studygroup_location_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='studygroup',
+            name='created_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['group', 'timestamp', 'id'], name='message_group_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['created_at', 'id'], name='studygroup_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:06
+
+import campus_cartel.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_alter_studygroup_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='studygroup',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='group_images/', validators=[campus_cartel.images.ImageUploadValidator()]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_count(apps, schema_editor):
+    StudyGroup = apps.get_model('groups', 'StudyGroup')
+    Membership = apps.get_model('groups', 'Membership')
+    members = Membership.objects.filter(studygroup=OuterRef('pk')).order_by().values('studygroup')
+    StudyGroup.objects.update(
+        member_count=Coalesce(Subquery(members.annotate(total=Count('*')).values('total')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0007_membership_message_group_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:34
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0008_studygroup_member_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['studygroup', 'joined_at', 'id'], name='membership_group_joined_idx'),
+        ),
+    ]
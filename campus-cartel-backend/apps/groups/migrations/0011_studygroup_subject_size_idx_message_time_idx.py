@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0010_suggestions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['timestamp', 'id'], name='message_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['subject', '-member_count', 'id'], name='studygroup_subject_size_idx'),
+        ),
+    ]
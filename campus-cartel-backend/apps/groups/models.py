@@ -1,6 +1,82 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
 from apps.users.models import User
 from django.utils.timezone import now  # Import timezone for default values
+from campus_cartel.db import insert_ignore
+from campus_cartel.images import ImageUploadValidator
+
+
+class GroupFull(Exception):
+    pass
+
+
+class _AlreadyMember(Exception):
+    pass
+
+
+# Members shown inline with a group; the full roster is paginated separately.
+MEMBER_PREVIEW_SIZE = 5
+
+
+class StudyGroupQuerySet(models.QuerySet):
+    def with_member_preview(self):
+        """
+        Attach the first ``MEMBER_PREVIEW_SIZE`` memberships of each group as
+        ``preview_memberships``: one windowed query per page, however large
+        the groups are.
+        """
+        return self.prefetch_related(member_preview())
+
+    def join(self, group_id, user_id):
+        """
+        Add a member if the group has room; returns ``(joined, member_count)``.
+
+        Capacity is enforced by the conditional ``member_count`` increment, so
+        concurrent joins can't overfill a group and nothing is locked beyond
+        the group's row. Raises ``GroupFull`` or ``StudyGroup.DoesNotExist``.
+        """
+        try:
+            with transaction.atomic():
+                if not self.filter(pk=group_id, member_count__lt=F('max_members')).update(member_count=F('member_count') + 1):
+                    if Membership.objects.filter(studygroup_id=group_id, user_id=user_id).exists():
+                        raise _AlreadyMember
+                    if not self.filter(pk=group_id).exists():
+                        raise self.model.DoesNotExist
+                    raise GroupFull
+                if not insert_ignore(Membership, studygroup_id=group_id, user_id=user_id):
+                    # Already a member: undo the increment.
+                    raise _AlreadyMember
+                self._members_changed('post_add', group_id, user_id)
+            joined = True
+        except _AlreadyMember:
+            joined = False
+        return joined, self.filter(pk=group_id).values_list('member_count', flat=True).get()
+
+    def leave(self, group_id, user_id):
+        """Mirror of ``join``; returns ``(left, member_count)``."""
+        with transaction.atomic():
+            deleted, _ = Membership.objects.filter(studygroup_id=group_id, user_id=user_id).delete()
+            if deleted:
+                self.filter(pk=group_id, member_count__gt=0).update(member_count=F('member_count') - 1)
+                self._members_changed('post_remove', group_id, user_id)
+        return bool(deleted), self.filter(pk=group_id).values_list('member_count', flat=True).get()
+
+    def _members_changed(self, action, group_id, user_id):
+        m2m_changed.send(
+            sender=Membership, instance=self.model(pk=group_id), action=action,
+            reverse=False, model=User, pk_set={user_id}, using=self.db,
+        )
+
+    def reconcile_counters(self):
+        """Rewrite ``member_count`` where it drifted from the membership rows."""
+        members = Membership.objects.filter(studygroup=models.OuterRef('pk')).order_by().values('studygroup')
+        actual = Coalesce(models.Subquery(members.annotate(total=models.Count('*')).values('total')), 0)
+        drifted_ids = list(self.annotate(actual=actual).exclude(member_count=F('actual')).values_list('pk', flat=True))
+        if not drifted_ids:
+            return 0
+        return self.model.objects.filter(pk__in=drifted_ids).update(member_count=actual)
 
 
 class StudyGroup(models.Model):
@@ -8,19 +84,88 @@ class StudyGroup(models.Model):
     subject = models.CharField(max_length=255)
     description = models.TextField()
     max_members = models.PositiveIntegerField()
-    image = models.ImageField(upload_to='group_images/', blank=True, null=True)
-    members = models.ManyToManyField(User, related_name='study_groups', blank=True)
-    created_at = models.DateTimeField(default=now,blank=True, null=True)
+    # Maintained by join()/leave(); reconcile_counters fixes drift from other writes.
+    member_count = models.PositiveIntegerField(default=0)
+    image = models.ImageField(upload_to='group_images/', blank=True, null=True, validators=[ImageUploadValidator()])
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    members = models.ManyToManyField(User, related_name='study_groups', blank=True, through='Membership')
+    created_at = models.DateTimeField(default=now, blank=True)
+
+    objects = StudyGroupQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='studygroup_created_idx'),
+            # Largest groups per subject, for group suggestions.
+            models.Index(fields=['subject', '-member_count', 'id'], name='studygroup_subject_size_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+def member_preview():
+    memberships = Membership.objects.roster()
+    return models.Prefetch('memberships', queryset=memberships[:MEMBER_PREVIEW_SIZE], to_attr='preview_memberships')
+
+
+class MembershipQuerySet(models.QuerySet):
+    def roster(self):
+        """Memberships in join order with just the member columns the API shows."""
+        return self.select_related('user').only(
+            'studygroup_id', 'joined_at', 'user__id', 'user__username', 'user__firstname', 'user__lastname', 'user__avatar'
+        ).order_by('joined_at', 'id')
+
+
+class Membership(models.Model):
+    # Keeps the table and column names of the former auto-created M2M.
+    studygroup = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_memberships')
+    # Highest message id this member has read; 0 when nothing was read yet.
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    joined_at = models.DateTimeField(default=now)
+
+    objects = MembershipQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'groups_studygroup_members'
+        unique_together = [('studygroup', 'user')]
+        indexes = [
+            models.Index(fields=['studygroup', 'joined_at', 'id'], name='membership_group_joined_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} in {self.studygroup_id}"
+
+
 class Message(models.Model):
     group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name="messages")
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'timestamp', 'id'], name='message_group_time_idx'),
+            models.Index(fields=['group', 'id'], name='message_group_id_idx'),
+            # The admin's newest-first change list.
+            models.Index(fields=['timestamp', 'id'], name='message_time_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.sender.username}: {self.content[:20]}"
\ No newline at end of file
+        return f"{self.sender.username}: {self.content[:20]}"
+
+
+class GroupSuggestion(models.Model):
+    """A precomputed suggested group; see ``compute_suggestions``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='group_suggestions')
+    group = models.ForeignKey(StudyGroup, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Accounts the user follows that are already members.
+    friends = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('user', 'group')]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='groupsuggestion_rank_idx'),
+        ]
@@ -1,14 +1,57 @@
 from rest_framework import serializers
-from .models import StudyGroup, Message
+from .models import MEMBER_PREVIEW_SIZE, GroupSuggestion, Membership, StudyGroup, Message, member_preview
+from apps.users.serializers import UserSerializer
+from campus_cartel.images import RenditionsField
+from campus_cartel.metrics import InstrumentedSerializerMixin
+from campus_cartel.sparse import SparseFieldsMixin
+
+class MemberSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='user.id', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    firstname = serializers.CharField(source='user.firstname', read_only=True)
+    lastname = serializers.CharField(source='user.lastname', read_only=True)
+    avatar = serializers.ImageField(source='user.avatar', read_only=True)
+
+    class Meta:
+        model = Membership
+        fields = ['id', 'username', 'firstname', 'lastname', 'avatar', 'joined_at']
+
+
+class StudyGroupSerializer(SparseFieldsMixin, InstrumentedSerializerMixin, serializers.ModelSerializer):
+    prefetches = {'member_preview': member_preview}
+    image_renditions = RenditionsField()
+    member_preview = serializers.SerializerMethodField()
 
-class StudyGroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudyGroup
-        fields = ['id', 'name', 'subject', 'description', 'max_members', 'image', 'members']
-        read_only_fields = ['members']
+        fields = ['id', 'name', 'subject', 'description', 'max_members', 'member_count', 'image', 'image_renditions', 'member_preview']
+        read_only_fields = ['member_count']
+
+    def get_member_preview(self, group):
+        memberships = getattr(group, 'preview_memberships', None)
+        if memberships is None:
+            # Not prefetched, e.g. a group that was just created.
+            memberships = Membership.objects.roster().filter(studygroup=group)[:MEMBER_PREVIEW_SIZE]
+        return MemberSerializer(memberships, many=True, context=self.context).data
+
+
+class GroupSuggestionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='group.id', read_only=True)
+    name = serializers.CharField(source='group.name', read_only=True)
+    subject = serializers.CharField(source='group.subject', read_only=True)
+    image = serializers.ImageField(source='group.image', read_only=True)
+    member_count = serializers.IntegerField(source='group.member_count', read_only=True)
+    max_members = serializers.IntegerField(source='group.max_members', read_only=True)
+
+    class Meta:
+        model = GroupSuggestion
+        fields = ['id', 'name', 'subject', 'image', 'member_count', 'max_members', 'score', 'friends']
+
 
+class MessageSerializer(SparseFieldsMixin, InstrumentedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'sender': UserSerializer}
 
-class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
-        fields = '__all__' 
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['group', 'sender'] 
\ No newline at end of file
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from campus_cartel import images
+from campus_cartel.cache import invalidate_object, invalidate_lists
+from .broadcast import MEMBER_LEFT, get_broadcast, group_channel
+from apps.users.suggestions import mark_stale
+from .models import GroupSuggestion, StudyGroup, Message
+from .serializers import MessageSerializer
+
+images.register(StudyGroup, 'image', 'image_renditions')
+
+
+@receiver(post_save, sender=Message)
+def broadcast_new_message(sender, instance, created, **kwargs):
+    if created:
+        payload = MessageSerializer(instance).data
+        transaction.on_commit(lambda: get_broadcast().publish(group_channel(instance.group_id), payload))
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def disconnect_departed_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_remove' or not pk_set:
+        return
+    pairs = [(pk, instance.pk) for pk in pk_set] if reverse else [(instance.pk, pk) for pk in pk_set]
+
+    def publish():
+        for group_id, user_id in pairs:
+            get_broadcast().publish(group_channel(group_id), {MEMBER_LEFT: user_id})
+
+    # Open chat sockets of the user close themselves on this event.
+    transaction.on_commit(publish)
+
+
+@receiver([post_save, post_delete], sender=StudyGroup)
+def invalidate_group(sender, instance, **kwargs):
+    invalidate_object('group', instance.pk)
+
+
+@receiver(images.renditions_ready, sender=StudyGroup)
+def invalidate_group_renditions(sender, pk, **kwargs):
+    invalidate_object('group', pk)
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def invalidate_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_object('group', instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            invalidate_object('group', pk)
+    else:
+        invalidate_lists('group')
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def memberships_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    pairs = [(instance.pk, pk) for pk in pk_set] if reverse else [(pk, instance.pk) for pk in pk_set]
+
+    def refresh():
+        mark_stale({user_id for user_id, _ in pairs})
+        if action == 'post_add':
+            for user_id, group_id in pairs:
+                GroupSuggestion.objects.filter(user_id=user_id, group_id=group_id).delete()
+
+    # Not inside join(), which holds the group's row lock.
+    transaction.on_commit(refresh)
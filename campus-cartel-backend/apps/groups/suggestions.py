@@ -0,0 +1,55 @@
+import heapq
+from collections import defaultdict
+
+from django.db.models import Count, F
+from apps.users.models import User
+from .models import GroupSuggestion, Membership, StudyGroup
+
+SUGGESTIONS_PER_USER = 20
+
+FRIEND_WEIGHT = 1.0
+# Groups on the user's major; also what users with no follows get.
+SUBJECT_WEIGHT = 0.5
+
+
+def suggested_groups(user_ids):
+    """``{user_id: [GroupSuggestion, ...]}`` for a batch of users, best first."""
+    open_groups = StudyGroup.objects.filter(member_count__lt=F('max_members'))
+    # (u, g): accounts u follows that are members of g.
+    friends = (
+        Membership.objects.filter(user__followers__in=user_ids, studygroup__in=open_groups)
+        .order_by().values_list('user__followers', 'studygroup').annotate(n=Count('*'))
+    )
+    counts = defaultdict(dict)
+    for user_id, group_id, n in friends:
+        counts[user_id][group_id] = n
+
+    joined = defaultdict(set)
+    for user_id, group_id in Membership.objects.filter(user__in=user_ids).values_list('user_id', 'studygroup_id'):
+        joined[user_id].add(group_id)
+    majors = dict(User.objects.filter(id__in=user_ids).values_list('id', 'major'))
+    # The largest open groups per subject, shared by everyone on that major.
+    by_subject = {
+        major: list(open_groups.filter(subject=major).order_by('-member_count', 'id').values_list('id', flat=True)[:SUGGESTIONS_PER_USER])
+        for major in set(majors.values()) if major
+    }
+    subjects = dict(StudyGroup.objects.filter(
+        id__in={group_id for groups in counts.values() for group_id in groups}
+    ).values_list('id', 'subject'))
+
+    suggestions = {}
+    for user_id in user_ids:
+        major = majors.get(user_id)
+        candidates = dict(counts[user_id])
+        for group_id in by_subject.get(major, ()):
+            candidates.setdefault(group_id, 0)
+            subjects[group_id] = major
+        ranked = [
+            GroupSuggestion(
+                user_id=user_id, group_id=group_id, friends=n,
+                score=n * FRIEND_WEIGHT + (SUBJECT_WEIGHT if major and subjects.get(group_id) == major else 0),
+            )
+            for group_id, n in candidates.items() if group_id not in joined[user_id]
+        ]
+        suggestions[user_id] = heapq.nlargest(SUGGESTIONS_PER_USER, ranked, key=lambda s: (s.score, -s.group_id))
+    return suggestions
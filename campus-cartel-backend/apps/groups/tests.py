@@ -1,9 +1,16 @@
-from django.test import TestCase
+import json
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from apps.groups.models import StudyGroup
+from django.core.cache import cache
+from apps.groups.models import MEMBER_PREVIEW_SIZE, StudyGroup, Message
 from apps.users.models import User
+from apps.groups.consumers import websocket_application
+from rest_framework_simplejwt.tokens import AccessToken
 
 class GroupTests(TestCase):
     def setUp(self):
@@ -33,11 +40,292 @@ class GroupTests(TestCase):
             name='Test Group',
             subject='Test Subject',
             description='This is a test group',
-            max_members=10,
-            meeting_time='Fridays at 5 PM',
-            location='Room 101'
+            max_members=10
         )
         join_url = reverse('join-group', args=[group.id])
         response = self.client.post(join_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(group.members.count(), 1)
\ No newline at end of file
+        self.assertEqual(group.members.count(), 1)
+
+class GroupMembershipTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.group = StudyGroup.objects.create(name='Small Group', subject='Test', description='Test', max_members=2)
+
+    def join(self, user=None):
+        client = self.client
+        if user is not None:
+            client = APIClient()
+            client.force_authenticate(user=user)
+        return client.post(reverse('join-group', args=[self.group.id]))
+
+    def test_join_is_idempotent_and_counted(self):
+        with self.assertNumQueries(5):
+            response = self.join()
+        self.assertEqual((response.data['joined'], response.data['members']), (True, 1))
+        response = self.join()
+        self.assertEqual((response.data['joined'], response.data['members']), (False, 1))
+        self.assertEqual(self.group.members.count(), 1)
+
+    def test_full_group_rejects_new_members(self):
+        self.join()
+        self.join(User.objects.create_user(username='second', email='second@example.com', password='testpassword'))
+        response = self.join(User.objects.create_user(username='third', email='third@example.com', password='testpassword'))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.group.refresh_from_db()
+        self.assertEqual((self.group.member_count, self.group.members.count()), (2, 2))
+
+    def test_leave_mirrors_join(self):
+        self.join()
+        response = self.client.post(reverse('leave-group', args=[self.group.id]))
+        self.assertEqual((response.data['left'], response.data['members']), (True, 0))
+        response = self.client.post(reverse('leave-group', args=[self.group.id]))
+        self.assertEqual((response.data['left'], response.data['members']), (False, 0))
+        self.assertEqual(self.client.post(reverse('join-group', args=[999])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reconcile_fixes_counts_from_other_writes(self):
+        self.group.members.add(self.user)
+        self.assertEqual(StudyGroup.objects.reconcile_counters(), 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 1)
+
+
+class GroupMessagePaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.group = StudyGroup.objects.create(name='Test Group', subject='Test Subject', description='Test', max_members=10)
+        self.messages = [
+            Message.objects.create(group=self.group, sender=self.user, content=f'Message {i}')
+            for i in range(5)
+        ]
+        self.group.members.add(self.user)
+        self.url = reverse('group-messages', args=[self.group.id])
+
+    def ids(self, response):
+        return [message['id'] for message in response.data['results']]
+
+    def test_before_returns_older_messages_in_order(self):
+        response = self.client.get(self.url, {'before': self.messages[4].id, 'page_size': 2})
+        self.assertEqual(self.ids(response), [self.messages[2].id, self.messages[3].id])
+        self.assertIsNotNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_after_returns_newer_messages(self):
+        response = self.client.get(self.url, {'after': self.messages[2].id, 'page_size': 5})
+        self.assertEqual(self.ids(response), [self.messages[3].id, self.messages[4].id])
+        self.assertIsNone(response.data['next'])
+
+    def test_cursor_mode_is_chronological(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(self.ids(response), [m.id for m in self.messages[:3]])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.ids(response), [m.id for m in self.messages[3:]])
+
+    def test_history_is_for_members_only(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='testpassword')
+        self.client.force_authenticate(user=outsider)
+        missing = reverse('group-messages', args=[999])
+        for async_reads in (True, False):
+            with self.subTest(async_reads=async_reads), self.settings(ASYNC_READ_VIEWS=async_reads):
+                response = self.client.get(self.url)
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+                self.assertNotIn('results', response.data)
+                self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+
+class GroupMessagePostingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.group = StudyGroup.objects.create(name='Big Group', subject='Test', description='Test', max_members=500)
+        others = User.objects.bulk_create([
+            User(username=f'member{i}', email=f'member{i}@example.com') for i in range(50)
+        ])
+        self.group.members.add(self.user, *others)
+        self.url = reverse('group-messages', args=[self.group.id])
+
+    def test_member_posts_with_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {'content': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['group'], response.data['sender']), (self.group.id, self.user.id))
+
+    def test_non_member_and_missing_group_are_rejected(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='testpassword')
+        self.client.force_authenticate(user=outsider)
+        self.assertEqual(self.client.post(self.url, {'content': 'Hi'}).status_code, status.HTTP_400_BAD_REQUEST)
+        missing = reverse('group-messages', args=[999])
+        self.assertEqual(self.client.post(missing, {'content': 'Hi'}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Message.objects.exists())
+
+
+class GroupSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.groups = [
+            StudyGroup.objects.create(name=f'Group {i}', subject='Test', description='Test', max_members=10)
+            for i in range(3)
+        ]
+        for group in self.groups:
+            group.members.add(self.user, self.other)
+        self.messages = [
+            Message.objects.create(group=self.groups[0], sender=self.other, content=f'Message {i}')
+            for i in range(5)
+        ]
+
+    def test_sync_returns_only_newer_messages(self):
+        url = reverse('group-messages-sync', args=[self.groups[0].id])
+        response = self.client.get(url, {'since': self.messages[1].id, 'limit': 2})
+        self.assertEqual([m['id'] for m in response.data['messages']], [m.id for m in self.messages[2:4]])
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get(url, {'since': response.data['last_id'], 'limit': 2})
+        self.assertEqual([m['id'] for m in response.data['messages']], [self.messages[4].id])
+        self.assertFalse(response.data['has_more'])
+
+    def test_sync_is_for_members_only(self):
+        outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='testpassword')
+        self.client.force_authenticate(user=outsider)
+        response = self.client.get(reverse('group-messages-sync', args=[self.groups[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn('messages', response.data)
+
+    def test_read_marker_only_moves_forward(self):
+        url = reverse('group-read', args=[self.groups[0].id])
+        self.assertEqual(self.client.post(url, {'message_id': self.messages[3].id}).data['last_read_message_id'], self.messages[3].id)
+        self.assertEqual(self.client.post(url, {'message_id': self.messages[0].id}).data['last_read_message_id'], self.messages[3].id)
+
+    def test_read_marker_stops_at_latest_message(self):
+        url = reverse('group-read', args=[self.groups[0].id])
+        response = self.client.post(url, {'message_id': self.messages[-1].id + 1000})
+        self.assertEqual(response.data['last_read_message_id'], self.messages[-1].id)
+        later = Message.objects.create(group=self.groups[0], sender=self.other, content='Later')
+        unread = {row['group']: row['unread'] for row in self.client.get(reverse('group-unread')).data['groups']}
+        self.assertEqual(unread[self.groups[0].id], 1)
+        self.assertEqual(self.client.post(url, {'message_id': later.id}).data['last_read_message_id'], later.id)
+
+    def test_unread_counts_for_all_groups_in_one_query(self):
+        Message.objects.create(group=self.groups[1], sender=self.other, content='Hi')
+        Message.objects.create(group=self.groups[1], sender=self.user, content='My own message')
+        self.client.post(reverse('group-read', args=[self.groups[0].id]), {'message_id': self.messages[2].id})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('group-unread'))
+        unread = {row['group']: row['unread'] for row in response.data['groups']}
+        self.assertEqual(unread, {self.groups[0].id: 2, self.groups[1].id: 1, self.groups[2].id: 0})
+        self.assertEqual(response.data['total'], 3)
+
+
+class GroupMemberListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpassword')
+            for i in range(8)
+        ]
+        self.client.force_authenticate(user=self.users[0])
+        self.groups = [
+            StudyGroup.objects.create(name=f'Group {i}', subject='Test', description='Test', max_members=10)
+            for i in range(3)
+        ]
+        for group in self.groups:
+            for user in self.users:
+                StudyGroup.objects.join(group.id, user.id)
+
+    def test_group_list_shows_count_and_preview_in_constant_queries(self):
+        # Groups plus one windowed query for every preview on the page.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('studygroup-list'))
+        group = response.data['results'][0]
+        self.assertNotIn('members', group)
+        self.assertEqual(group['member_count'], 8)
+        self.assertEqual([m['username'] for m in group['member_preview']], [f'user{i}' for i in range(MEMBER_PREVIEW_SIZE)])
+
+    def test_member_list_is_cursor_paginated_in_join_order(self):
+        url = reverse('group-members', args=[self.groups[0].id])
+        response = self.client.get(url, {'page_size': 5})
+        self.assertEqual([m['id'] for m in response.data['results']], [u.id for u in self.users[:5]])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([m['id'] for m in response.data['results']], [u.id for u in self.users[5:]])
+        self.assertIsNone(response.data['next'])
+
+    def test_member_list_of_missing_group(self):
+        self.assertEqual(self.client.get(reverse('group-members', args=[999])).status_code, status.HTTP_404_NOT_FOUND)
+
+class GroupChatSocketTests(TransactionTestCase):
+    # The consumer closes stale connections around its queries, which would
+    # break TestCase's wrapping transaction on other databases than SQLite.
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.group = StudyGroup.objects.create(name='Test Group', subject='Test Subject', description='Test', max_members=10)
+        self.group.members.add(self.user)
+
+    def connect(self, user=None, path=None):
+        token = str(AccessToken.for_user(user or self.user))
+        return ApplicationCommunicator(websocket_application, {
+            'type': 'websocket',
+            'path': path or f'/ws/groups/{self.group.id}/',
+            'query_string': f'token={token}'.encode(),
+        })
+
+    def post_message(self, content):
+        Message.objects.create(group=self.group, sender=self.user, content=content)
+
+    async def test_member_receives_new_messages(self):
+        communicator = self.connect()
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+
+        await sync_to_async(self.post_message)('Hello group')
+        event = await communicator.receive_output(1)
+        self.assertEqual(json.loads(event['text'])['content'], 'Hello group')
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(1)
+
+    async def test_non_member_is_rejected(self):
+        outsider = await sync_to_async(User.objects.create_user)(
+            username='outsider', email='outsider@example.com', password='testpassword'
+        )
+        communicator = self.connect(user=outsider)
+        await communicator.send_input({'type': 'websocket.connect'})
+        event = await communicator.receive_output(1)
+        self.assertEqual(event, {'type': 'websocket.close', 'code': 4003})
+
+    async def test_missing_token_is_rejected(self):
+        communicator = ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': f'/ws/groups/{self.group.id}/', 'query_string': b'',
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        event = await communicator.receive_output(1)
+        self.assertEqual(event['code'], 4001)
+
+    async def test_socket_closes_when_member_leaves(self):
+        communicator = self.connect()
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+
+        await sync_to_async(StudyGroup.objects.leave)(self.group.id, self.user.id)
+        event = await communicator.receive_output(1)
+        self.assertEqual(event, {'type': 'websocket.close', 'code': 4003})
+
+    async def test_departed_member_cannot_post(self):
+        communicator = self.connect()
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await communicator.receive_output(1))['type'], 'websocket.accept')
+
+        # Left without the departure reaching this socket, e.g. from another worker.
+        await sync_to_async(StudyGroup.members.through.objects.filter(user=self.user).delete)()
+        await communicator.send_input({'type': 'websocket.receive', 'text': json.dumps({'content': 'Still here?'})})
+        event = await communicator.receive_output(1)
+        self.assertEqual(event, {'type': 'websocket.close', 'code': 4003})
+        self.assertFalse(await Message.objects.filter(group=self.group).aexists())
+
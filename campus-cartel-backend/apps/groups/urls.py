@@ -1,9 +1,18 @@
 from django.urls import path
-from .views import StudyGroupListView, StudyGroupDetailView, GroupMessagesView, JoinGroupView
+from .views import (
+    StudyGroupListView, StudyGroupDetailView, GroupMembersView, AsyncGroupMessagesView, JoinGroupView, LeaveGroupView,
+    GroupMessageSyncView, MarkGroupReadView, GroupUnreadView, GroupSuggestionsView
+)
 
 urlpatterns = [
     path('', StudyGroupListView.as_view(), name='studygroup-list'),
     path('<int:pk>/', StudyGroupDetailView.as_view(), name='studygroup-detail'),
-    path('<int:group_id>/messages/', GroupMessagesView.as_view(), name='group-messages'),
+    path('<int:pk>/members/', GroupMembersView.as_view(), name='group-members'),
+    path('<int:group_id>/messages/', AsyncGroupMessagesView.as_view(), name='group-messages'),
     path('<int:pk>/join/', JoinGroupView.as_view(), name='join-group'),
+    path('<int:pk>/leave/', LeaveGroupView.as_view(), name='leave-group'),
+    path('<int:group_id>/messages/sync/', GroupMessageSyncView.as_view(), name='group-messages-sync'),
+    path('<int:group_id>/read/', MarkGroupReadView.as_view(), name='group-read'),
+    path('unread/', GroupUnreadView.as_view(), name='group-unread'),
+    path('suggestions/', GroupSuggestionsView.as_view(), name='group-suggestions'),
 ]
\ No newline at end of file
@@ -2,49 +2,205 @@ from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from django.db.models import Count, F, FilteredRelation, Max, Q
 from django.shortcuts import get_object_or_404
-from .models import StudyGroup, Message
-from .serializers import StudyGroupSerializer, MessageSerializer
+from .models import GroupFull, GroupSuggestion, StudyGroup, Membership, Message
+from .serializers import GroupSuggestionSerializer, MemberSerializer, StudyGroupSerializer, MessageSerializer
+from campus_cartel.asyncviews import AsyncListView
+from campus_cartel.cache import CachedListMixin, CachedRetrieveMixin
+from campus_cartel.pagination import MembershipPagination, StudyGroupPagination, MessagePagination
+from campus_cartel.sparse import SparseQuerysetMixin
 
-class StudyGroupListView(generics.ListCreateAPIView):
-    queryset = StudyGroup.objects.all()
+class StudyGroupListView(SparseQuerysetMixin, CachedListMixin, generics.ListCreateAPIView):
+    queryset = StudyGroup.objects.with_member_preview()
     serializer_class = StudyGroupSerializer
+    cache_namespace = 'group'
     permission_classes = [IsAuthenticated]
+    pagination_class = StudyGroupPagination
 
     def perform_create(self, serializer):
         if self.request.user.user_type != 'student':
             raise ValidationError("Only students can create groups.")
         serializer.save()
 
-class StudyGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = StudyGroup.objects.all()
+class StudyGroupDetailView(SparseQuerysetMixin, CachedRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = StudyGroup.objects.with_member_preview()
     serializer_class = StudyGroupSerializer
+    cache_namespace = 'group'
     permission_classes = [IsAuthenticated]
 
+class GroupMembersView(generics.ListAPIView):
+    """The full roster in join order, cursor-paginated."""
+    serializer_class = MemberSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = MembershipPagination
+
+    def get_queryset(self):
+        return Membership.objects.roster().filter(studygroup_id=self.kwargs['pk'])
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not response.data['results']:
+            # Only an empty page needs to tell a missing group from an empty one.
+            get_object_or_404(StudyGroup, pk=self.kwargs['pk'])
+        return response
+
 class JoinGroupView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
         if request.user.user_type != 'student':
             return Response({'detail': 'Only students can join groups.'}, status=status.HTTP_403_FORBIDDEN)
-        group = get_object_or_404(StudyGroup, pk=pk)
-        group.members.add(request.user)
-        group.save()
-        return Response({'detail': f'Joined group {group.name} successfully.', 'members': group.members.count()})
+        try:
+            joined, member_count = StudyGroup.objects.join(pk, request.user.id)
+        except StudyGroup.DoesNotExist:
+            raise NotFound()
+        except GroupFull:
+            return Response({'detail': 'This group is full.'}, status=status.HTTP_409_CONFLICT)
+        detail = 'Joined group successfully.' if joined else 'You are already a member of this group.'
+        return Response({'detail': detail, 'joined': joined, 'members': member_count})
+
+class LeaveGroupView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            left, member_count = StudyGroup.objects.leave(pk, request.user.id)
+        except StudyGroup.DoesNotExist:
+            raise NotFound()
+        detail = 'Left group successfully.' if left else 'You are not a member of this group.'
+        return Response({'detail': detail, 'left': left, 'members': member_count})
 
-class GroupMessagesView(generics.ListCreateAPIView):
+class GroupMessagesView(SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessagePagination
 
     def get_queryset(self):
         group_id = self.kwargs['group_id']
         return Message.objects.filter(group_id=group_id).order_by('timestamp')
 
+    def list(self, request, *args, **kwargs):
+        group_id = self.kwargs['group_id']
+        if not Membership.objects.filter(studygroup_id=group_id, user_id=request.user.id).exists():
+            get_object_or_404(StudyGroup, pk=group_id)
+            raise PermissionDenied("You are not a member of this group.")
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        group_id = self.kwargs['group_id']
         if self.request.user.user_type != 'student':
             raise ValidationError("Only students can chat in groups.")
-        if self.request.user not in group.members.all():
+        # One indexed EXISTS on the membership table; the group itself is only
+        # looked up to tell a missing group from a non-member.
+        if not Membership.objects.filter(studygroup_id=group_id, user_id=self.request.user.id).exists():
+            get_object_or_404(StudyGroup, pk=group_id)
             raise ValidationError("You must join the group to send messages.")
-        serializer.save(group=group, sender=self.request.user)
\ No newline at end of file
+        serializer.save(group_id=group_id, sender=self.request.user)
+
+
+class AsyncGroupMessagesView(AsyncListView):
+    view_class = GroupMessagesView
+
+    async def read(self, view, request):
+        group_id = view.kwargs['group_id']
+        if not await Membership.objects.filter(studygroup_id=group_id, user_id=request.user.id).aexists():
+            if not await StudyGroup.objects.filter(pk=group_id).aexists():
+                raise NotFound()
+            raise PermissionDenied("You are not a member of this group.")
+        return await super().read(view, request)
+
+
+class GroupMessageSyncView(APIView):
+    """
+    Messages newer than the client's last seen id: ``?since=<id>&limit=<n>``.
+
+    Clients call it again with the returned ``last_id`` while ``has_more`` is
+    true; each call is one range scan on the (group, id) index.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+
+    def get(self, request, group_id):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError("'since' and 'limit' must be integers.")
+        limit = max(1, min(limit, self.max_limit))
+        if not Membership.objects.filter(studygroup_id=group_id, user_id=request.user.id).exists():
+            return Response({'detail': 'You are not a member of this group.'}, status=status.HTTP_403_FORBIDDEN)
+
+        messages = list(Message.objects.filter(group_id=group_id, id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        return Response({
+            'messages': MessageSerializer(messages, many=True).data,
+            'last_id': messages[-1].id if messages else since,
+            'has_more': has_more,
+        })
+
+
+class MarkGroupReadView(APIView):
+    """
+    Move the caller's read marker forward to ``message_id``; it never moves
+    back, nor past the group's latest message.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, group_id):
+        try:
+            message_id = int(request.data.get('message_id'))
+        except (TypeError, ValueError):
+            raise ValidationError("'message_id' must be an integer.")
+        # A marker past the last message would hide every message sent later.
+        latest = Message.objects.filter(group_id=group_id).aggregate(latest=Max('id'))['latest'] or 0
+        message_id = min(message_id, latest)
+        membership = Membership.objects.filter(studygroup_id=group_id, user_id=request.user.id)
+        if not membership.filter(last_read_message_id__lt=message_id).update(last_read_message_id=message_id):
+            last_read = membership.values_list('last_read_message_id', flat=True).first()
+            if last_read is None:
+                return Response({'detail': 'You are not a member of this group.'}, status=status.HTTP_403_FORBIDDEN)
+            return Response({'last_read_message_id': last_read})
+        return Response({'last_read_message_id': message_id})
+
+
+class GroupUnreadView(APIView):
+    """Unread message counts for every group the caller belongs to, in one query."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # The condition goes in the join's ON clause, so only unread messages
+        # are joined rather than every message of every group.
+        unread_messages = FilteredRelation(
+            'studygroup__messages',
+            condition=Q(studygroup__messages__id__gt=F('last_read_message_id')) & ~Q(studygroup__messages__sender_id=request.user.id),
+        )
+        rows = (
+            Membership.objects.filter(user_id=request.user.id)
+            .annotate(unread_messages=unread_messages)
+            .values('studygroup_id', 'last_read_message_id')
+            .annotate(unread=Count('unread_messages'))
+            .order_by('studygroup_id')
+        )
+        groups = [
+            {'group': row['studygroup_id'], 'last_read_message_id': row['last_read_message_id'], 'unread': row['unread']}
+            for row in rows
+        ]
+        return Response({'groups': groups, 'total': sum(group['unread'] for group in groups)})
+
+
+
+class GroupSuggestionsView(generics.ListAPIView):
+    """Suggested groups, precomputed by ``compute_suggestions``; one indexed query."""
+    serializer_class = GroupSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return GroupSuggestion.objects.filter(user_id=self.request.user.id).select_related('group').only(
+            'score', 'friends', 'group__id', 'group__name', 'group__subject', 'group__image',
+            'group__member_count', 'group__max_members',
+        ).order_by('-score')
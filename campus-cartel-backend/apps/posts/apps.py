@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class PostsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.posts'
+    label = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.posts.models import Post
+from apps.posts.timeline import fan_out
+
+class Command(BaseCommand):
+    help = "Materialize recent posts into their followers' home timelines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        posts = Post.objects.filter(created_at__gte=since).select_related('author').order_by('created_at', 'id')
+        total = 0
+        for post in posts.iterator(chunk_size=500):
+            fan_out(post)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Fanned out {total} posts."))
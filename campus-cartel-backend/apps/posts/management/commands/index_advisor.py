@@ -0,0 +1,127 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.db.models import F
+from django.utils import timezone
+from apps.groups.models import GroupSuggestion, Membership, Message, StudyGroup
+from apps.posts.models import Comment, Post, TimelineEntry
+from apps.search.index import search_queryset
+from apps.users.models import Follow, User, UserSuggestion
+from campus_cartel.pagination import (
+    CommentPagination, MembershipPagination, MessagePagination, PostPagination, SearchPagination, StudyGroupPagination,
+    UserPagination,
+)
+
+PAGE = 21
+FULL_SCAN = 'full scan'
+FILESORT = 'filesort'
+
+
+def _next_page(queryset, pagination):
+    """The query for a page after the first, sought from a cursor."""
+    position = [timezone.now() if name.lstrip('-') in ('created_at', 'timestamp', 'joined_at', 'date_joined') else 1
+                for name in pagination.ordering]
+    return queryset.order_by(*pagination.ordering).filter(pagination().seek_filter(position))[:PAGE]
+
+
+# name: (queryset, problems it is expected to have). Add an entry for every
+# list or lookup a new endpoint runs.
+CHECKS = {
+    'post-list': (lambda: Post.objects.order_by(*PostPagination.ordering)[:PAGE], ()),
+    'post-list-next-page': (lambda: _next_page(Post.objects.all(), PostPagination), ()),
+    'posts-by-author': (lambda: Post.objects.filter(author_id=1).order_by('-created_at', '-id')[:PAGE], ()),
+    'timeline': (lambda: TimelineEntry.objects.filter(owner_id=1).order_by('-created_at', '-post_id')[:PAGE], ()),
+    'liked-posts': (lambda: Post.likes.through.objects.filter(user_id=1, post_id__in=[1, 2, 3]), ()),
+    'comment-list': (lambda: Comment.objects.filter(post_id=1).order_by(*CommentPagination.ordering)[:PAGE], ()),
+    'comment-threads': (
+        lambda: Comment.objects.filter(post_id=1, parent=None).order_by(*CommentPagination.ordering)[:PAGE], ()
+    ),
+    'comment-replies': (lambda: Comment.objects.filter(parent_id=1).order_by(*CommentPagination.ordering)[:PAGE], ()),
+    'group-list': (lambda: StudyGroup.objects.order_by(*StudyGroupPagination.ordering)[:PAGE], ()),
+    'groups-by-subject': (
+        lambda: StudyGroup.objects.filter(subject='Law', member_count__lt=F('max_members'))
+        .order_by('-member_count', 'id')[:PAGE],
+        (),
+    ),
+    'group-members': (
+        lambda: Membership.objects.filter(studygroup_id=1).roster().order_by(*MembershipPagination.ordering)[:PAGE], ()
+    ),
+    'group-messages': (lambda: Message.objects.filter(group_id=1).order_by(*MessagePagination.ordering)[:PAGE], ()),
+    'group-messages-next-page': (lambda: _next_page(Message.objects.filter(group_id=1), MessagePagination), ()),
+    'group-messages-sync': (lambda: Message.objects.filter(group_id=1, id__gt=1).order_by('id')[:PAGE], ()),
+    'user-list': (lambda: User.objects.order_by(*UserPagination.ordering)[:PAGE], ()),
+    'user-followers': (lambda: Follow.objects.filter(from_user_id=1).order_by('-id')[:PAGE], ()),
+    'user-following': (lambda: Follow.objects.filter(to_user_id=1).order_by('-id')[:PAGE], ()),
+    'user-suggestions': (lambda: UserSuggestion.objects.filter(user_id=1).order_by('-score')[:PAGE], ()),
+    'group-suggestions': (lambda: GroupSuggestion.objects.filter(user_id=1).order_by('-score')[:PAGE], ()),
+    # Ranking by a summed score always sorts the matches.
+    'search': (lambda: search_queryset('campus life').order_by(*SearchPagination.ordering)[:PAGE], (FILESORT,)),
+    # Admin change lists add the primary key to their ordering.
+    'admin-posts': (lambda: Post.objects.order_by('-created_at', '-pk')[:100], ()),
+    'admin-comments': (lambda: Comment.objects.order_by('-created_at', '-pk')[:100], ()),
+    'admin-groups': (lambda: StudyGroup.objects.order_by('-created_at', '-pk')[:100], ()),
+    'admin-messages': (lambda: Message.objects.order_by('-timestamp', '-pk')[:100], ()),
+}
+
+
+def plan_problems(vendor, plan):
+    """``(problem, table)`` pairs for the full scans and sorts in an EXPLAIN ``plan``."""
+    problems = []
+    for line in plan.splitlines():
+        line = line.strip()
+        if vendor == 'sqlite':
+            # "SCAN t" reads the whole table; "SCAN t USING INDEX i" walks an index in order.
+            scan = re.search(r'\bSCAN (?:TABLE )?(\w+)$', line)
+            if scan and scan.group(1) != 'CONSTANT':
+                problems.append((FULL_SCAN, scan.group(1)))
+            if re.search(r'USE TEMP B-TREE FOR .*ORDER BY', line):
+                problems.append((FILESORT, None))
+        elif vendor == 'mysql':
+            # id select_type table partitions type possible_keys key key_len ref rows filtered Extra
+            columns = line.split()
+            if len(columns) > 4 and columns[4] == 'ALL':
+                problems.append((FULL_SCAN, columns[2]))
+            if 'Using filesort' in line:
+                problems.append((FILESORT, None))
+        elif vendor == 'postgresql':
+            scan = re.search(r'Seq Scan on (\w+)', line)
+            if scan:
+                problems.append((FULL_SCAN, scan.group(1)))
+            if re.match(r'(->\s+)?(Incremental )?Sort\b', line):
+                problems.append((FILESORT, None))
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the project's key querysets and flag full table scans and filesorts. "
+        "Planners skip indexes on tiny tables, so run it against a realistic dataset (see populate_db)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(CHECKS), help="Check these querysets only")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not just flagged ones")
+
+    def handle(self, *args, **options):
+        flagged = []
+        for name in options['only'] or CHECKS:
+            build, allowed = CHECKS[name]
+            queryset = build()
+            vendor = connections[router.db_for_read(queryset.model)].vendor
+            plan = queryset.explain()
+            problems = [
+                f"{problem} of {table}" if table else problem
+                for problem, table in plan_problems(vendor, plan) if problem not in allowed
+            ]
+            if problems:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f"{name}: {', '.join(dict.fromkeys(problems))}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+            if problems or options['verbose_plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if flagged:
+            raise CommandError(f"Querysets needing an index: {', '.join(flagged)}")
+        self.stdout.write(self.style.SUCCESS("Every checked queryset uses an index."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from apps.posts.models import Post, Comment
+from apps.groups.models import StudyGroup
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = "Recompute denormalized like/comment/share/member/follow counters that drifted from their relations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Post, Comment, StudyGroup, User):
+            fixed = 0
+            last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+            for start in range(0, last_id + 1, batch_size):
+                fixed += model.objects.filter(id__gte=start, id__lt=start + batch_size).reconcile_counters()
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {fixed} rows reconciled")
+
+        self.stdout.write(self.style.SUCCESS("Counters reconciled successfully!"))
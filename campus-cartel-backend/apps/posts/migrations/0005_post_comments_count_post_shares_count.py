@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+
+    def count(queryset, field):
+        counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        return Coalesce(Subquery(counted.annotate(total=Count('*')).values('total')), 0)
+
+    Post.objects.update(
+        likes_count=count(Post.likes.through.objects.all(), 'post'),
+        comments_count=count(Comment.objects.all(), 'post'),
+        shares_count=count(Post.shares.through.objects.all(), 'post'),
+    )
+    Comment.objects.update(likes_count=count(Comment.likes.through.objects.all(), 'comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_comment_comment_post_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='shares_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
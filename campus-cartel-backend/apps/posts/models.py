@@ -1,32 +1,232 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from apps.users.models import User
+from campus_cartel.db import insert_ignore
+from campus_cartel.images import ImageUploadValidator
+
+
+def _related_count(queryset, field):
+    # Correlated COUNT per row; avoids the row explosion of joining several
+    # to-many relations in a single GROUP BY.
+    counted = queryset.filter(**{field: models.OuterRef('pk')}).order_by().values(field)
+    counted = counted.annotate(total=models.Count('*')).values('total')
+    return Coalesce(models.Subquery(counted), 0)
+
+
+class CounterQuerySet(models.QuerySet):
+    def actual_counts(self):
+        raise NotImplementedError
+
+    def reconcile_counters(self):
+        """Rewrite the counter columns of rows that drifted from their relations."""
+        actual = self.actual_counts()
+        drifted = self.annotate(**{f'actual_{name}': value for name, value in actual.items()})
+        condition = Q()
+        for name in actual:
+            condition |= ~Q(**{name: F(f'actual_{name}')})
+        drifted_ids = list(drifted.filter(condition).values_list('pk', flat=True))
+        if not drifted_ids:
+            return 0
+        return self.model.objects.filter(pk__in=drifted_ids).update(**actual)
+
+    def add_relation(self, relation, counter, object_id, user_id):
+        """Idempotently link a user; one INSERT, plus the counter bump if it was new."""
+        through = getattr(self.model, relation).through
+        with transaction.atomic():
+            inserted = insert_ignore(through, **{f'{self.model._meta.model_name}_id': object_id, 'user_id': user_id})
+            if inserted:
+                if not self.filter(pk=object_id).update(**{counter: F(counter) + 1}):
+                    raise self.model.DoesNotExist
+                self._relation_changed(through, 'post_add', object_id, user_id)
+        return bool(inserted)
+
+    def remove_relation(self, relation, counter, object_id, user_id):
+        """Idempotently unlink a user; one DELETE, plus the counter drop if a row went."""
+        through = getattr(self.model, relation).through
+        with transaction.atomic():
+            deleted, _ = through.objects.filter(**{f'{self.model._meta.model_name}_id': object_id, 'user_id': user_id}).delete()
+            if deleted:
+                self.filter(pk=object_id, **{f'{counter}__gt': 0}).update(**{counter: F(counter) - 1})
+                self._relation_changed(through, 'post_remove', object_id, user_id)
+        return bool(deleted)
+
+    def _relation_changed(self, through, action, object_id, user_id):
+        # Same signal the related manager sends, so receivers see these writes
+        # like any other change to the relation.
+        m2m_changed.send(
+            sender=through, instance=self.model(pk=object_id), action=action,
+            reverse=False, model=User, pk_set={user_id}, using=self.db,
+        )
+
+    def _liked(self, user_id, object_ids):
+        through = self.model.likes.through
+        field = f'{self.model._meta.model_name}_id'
+        return through.objects.filter(user_id=user_id, **{f'{field}__in': object_ids}).values_list(field, flat=True)
+
+    def liked_ids(self, user_id, object_ids):
+        return set(self._liked(user_id, object_ids))
+
+    async def aliked_ids(self, user_id, object_ids):
+        return {object_id async for object_id in self._liked(user_id, object_ids)}
+
+    def add_like(self, object_id, user_id):
+        return self.add_relation('likes', 'likes_count', object_id, user_id)
+
+    def remove_like(self, object_id, user_id):
+        return self.remove_relation('likes', 'likes_count', object_id, user_id)
+
+
+class PostQuerySet(CounterQuerySet):
+    def for_feed(self):
+        return self.select_related('author').prefetch_related('likes', 'shares')
+
+    def actual_counts(self):
+        return {
+            'likes_count': _related_count(Post.likes.through.objects.all(), 'post'),
+            'comments_count': _related_count(Comment.objects.all(), 'post'),
+            'shares_count': _related_count(Post.shares.through.objects.all(), 'post'),
+        }
+
+    def add_share(self, post_id, user_id):
+        return self.add_relation('shares', 'shares_count', post_id, user_id)
+
+    def remove_share(self, post_id, user_id):
+        return self.remove_relation('shares', 'shares_count', post_id, user_id)
+
+
+class CommentQuerySet(CounterQuerySet):
+    def for_feed(self):
+        return self.select_related('author').prefetch_related('likes')
+
+    def first_replies(self, parent_ids, limit):
+        """The first ``limit`` replies to each of ``parent_ids``, in one windowed query."""
+        rank = models.Window(RowNumber(), partition_by=F('parent_id'), order_by=[F('created_at').asc(), F('id').asc()])
+        return self.filter(parent_id__in=parent_ids).annotate(reply_rank=rank).filter(reply_rank__lte=limit)
+
+    def actual_counts(self):
+        return {
+            'likes_count': _related_count(Comment.likes.through.objects.all(), 'comment'),
+            'replies_count': _related_count(Comment.objects.all(), 'parent'),
+        }
+
 
 class Post(models.Model):
-    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
+    # Indexed as the prefix of post_author_created_idx.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts', db_index=False)
     content = models.TextField()
-    image = models.ImageField(upload_to='post_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='post_images/', blank=True, null=True, validators=[ImageUploadValidator()])
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
     shares = models.ManyToManyField(User, related_name='shared_posts', blank=True)
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    shares_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='post_created_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], name='post_author_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.author.username}: {self.content[:30]}"
 
     def like_count(self):
-        return self.likes.count()
+        return self.likes_count
 
     def comment_count(self):
-        return self.comments.count()
+        return self.comments_count
+
+    def add_like(self, user):
+        return Post.objects.add_like(self.pk, user.pk)
+
+    def remove_like(self, user):
+        return Post.objects.remove_like(self.pk, user.pk)
+
+    def add_share(self, user):
+        return Post.objects.add_share(self.pk, user.pk)
+
+    def remove_share(self, user):
+        return Post.objects.remove_share(self.pk, user.pk)
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed by comment_parent_created_idx.
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies', null=True, blank=True, db_index=False)
+    # 0 for comments on the post itself.
+    depth = models.PositiveSmallIntegerField(default=0)
     content = models.TextField()
     likes = models.ManyToManyField(User, related_name='liked_comments', blank=True)
+    likes_count = models.IntegerField(default=0)
+    replies_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='comment_created_idx'),
+            models.Index(fields=['post', 'parent', 'created_at', 'id'], name='comment_post_thread_idx'),
+            models.Index(fields=['parent', 'created_at', 'id'], name='comment_parent_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.author.username}: {self.content[:30]}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.parent_id:
+            self.depth = self.parent.depth + 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Post.objects.filter(pk=self.post_id).update(comments_count=F('comments_count') + 1)
+                if self.parent_id:
+                    Comment.objects.filter(pk=self.parent_id).update(replies_count=F('replies_count') + 1)
+
+    def delete(self, *args, **kwargs):
+        post_id, parent_id = self.post_id, self.parent_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # Replies go with the comment they answer.
+            removed = result[1].get(self._meta.label, 1)
+            Post.objects.filter(pk=post_id).update(comments_count=Greatest(F('comments_count') - removed, 0))
+            if parent_id:
+                Comment.objects.filter(pk=parent_id, replies_count__gt=0).update(replies_count=F('replies_count') - 1)
+        return result
+
     def like_count(self):
-        return self.likes.count()
\ No newline at end of file
+        return self.likes_count
+
+    def add_like(self, user):
+        return Comment.objects.add_like(self.pk, user.pk)
+
+    def remove_like(self, user):
+        return Comment.objects.remove_like(self.pk, user.pk)
+
+
+class TimelineEntry(models.Model):
+    """A post materialized into a follower's home timeline at write time."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'], name='timeline_owner_post_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'created_at', 'post'], name='timeline_owner_created_idx'),
+            models.Index(fields=['owner', 'author'], name='timeline_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} <- {self.post_id}"
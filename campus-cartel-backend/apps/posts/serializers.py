@@ -1,29 +1,47 @@
 from rest_framework import serializers
 from .models import Post, Comment
 from apps.users.serializers import UserSerializer  # Adjust as needed
+from campus_cartel.images import RenditionsField
+from campus_cartel.metrics import InstrumentedSerializerMixin
+from campus_cartel.sparse import SparseFieldsMixin
 
-class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    like_count = serializers.SerializerMethodField()
-    comment_count = serializers.SerializerMethodField()
+class PostSerializer(SparseFieldsMixin, InstrumentedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'author': UserSerializer}
+    optional_fields = ['likes', 'shares']
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
+    comment_count = serializers.IntegerField(source='comments_count', read_only=True)
+    share_count = serializers.IntegerField(source='shares_count', read_only=True)
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Post
-        fields = '__all__'
+        exclude = ['likes_count', 'comments_count', 'shares_count']
+        read_only_fields = ['author', 'likes', 'shares']
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
-
-    def get_comment_count(self, obj):
-        return obj.comments.count()
-
-class CommentSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    like_count = serializers.SerializerMethodField()
+class CommentSerializer(SparseFieldsMixin, InstrumentedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {'author': UserSerializer}
+    optional_fields = ['likes']
+    # Threads are assembled from the parent pointers.
+    kept_fields = ('id', 'parent')
+    like_count = serializers.IntegerField(source='likes_count', read_only=True)
 
     class Meta:
         model = Comment
-        fields = '__all__'
+        exclude = ['likes_count']
+        read_only_fields = ['author', 'likes', 'depth', 'replies_count']
+        extra_kwargs = {'post': {'required': False}}
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
\ No newline at end of file
+    def validate(self, attrs):
+        parent = attrs.get('parent')
+        if self.instance is not None:
+            moved = 'post' in attrs and attrs['post'].pk != self.instance.post_id
+            moved |= 'parent' in attrs and getattr(parent, 'pk', None) != self.instance.parent_id
+            if moved:
+                raise serializers.ValidationError("A comment can't be moved.")
+            return attrs
+        if parent is None:
+            if 'post' not in attrs:
+                raise serializers.ValidationError({'post': 'This field is required.'})
+        elif attrs.setdefault('post', parent.post).pk != parent.post_id:
+            raise serializers.ValidationError({'parent': 'Replies must be on the same post.'})
+        return attrs
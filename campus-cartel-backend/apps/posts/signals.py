@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from campus_cartel import images
+from campus_cartel.cache import invalidate_object, invalidate_lists
+from apps.users.models import Follow
+from . import timeline
+from .models import Post, Comment
+
+images.register(Post, 'image', 'image_renditions')
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    invalidate_object('post', instance.pk)
+
+
+@receiver(images.renditions_ready, sender=Post)
+def invalidate_post_renditions(sender, pk, **kwargs):
+    invalidate_object('post', pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    # The post embeds its comment count.
+    invalidate_object('post', instance.post_id)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+@receiver(m2m_changed, sender=Post.shares.through)
+def invalidate_post_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_object('post', instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            invalidate_object('post', pk)
+    else:
+        invalidate_lists('post')
+
+
+@receiver(m2m_changed, sender=Follow)
+def update_timelines(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    pairs = [(instance.pk, pk) for pk in pk_set] if reverse else [(pk, instance.pk) for pk in pk_set]
+    update = timeline.follow_backfill if action == 'post_add' else timeline.unfollow_cleanup
+
+    def apply():
+        for follower_id, followed_id in pairs:
+            update(follower_id, followed_id)
+
+    transaction.on_commit(apply)
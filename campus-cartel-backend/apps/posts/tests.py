@@ -1,9 +1,27 @@
-from django.test import TestCase
+import io
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from apps.posts.models import Post
+from apps.posts.management.commands.index_advisor import plan_problems
+from apps.posts.models import Post, Comment, TimelineEntry
+from apps.posts import timeline
+from apps.posts.timeline import fan_out, pull_author_ids
+from apps.groups.models import StudyGroup
+from apps.users.authentication import ClaimsRefreshToken
 from apps.users.models import User
+from campus_cartel.metrics import RequestMetrics
 
 class PostTests(TestCase):
     def setUp(self):
@@ -28,4 +46,505 @@ class PostTests(TestCase):
         Post.objects.create(author=self.user, content='Test post 2')
         response = self.client.get(self.post_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 2)
+
+class PostQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpassword')
+            for i in range(3)
+        ]
+
+    def create_posts(self, count):
+        for i in range(count):
+            author = self.users[i % len(self.users)]
+            post = Post.objects.create(author=author, content=f'Post {i}')
+            for user in self.users:
+                post.add_like(user)
+            Comment.objects.create(post=post, author=author, content='Nice')
+
+    def test_post_list_query_count_is_bounded(self):
+        self.create_posts(2)
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(reverse('post-list'))
+        self.create_posts(20)
+        with self.assertNumQueries(len(small_page)):
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_post_detail_counts(self):
+        self.create_posts(1)
+        post = Post.objects.get()
+        # Likes and shares lists are only prefetched when expanded.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('post-detail', args=[post.id]))
+        self.assertEqual(response.data['like_count'], 3)
+        self.assertEqual(response.data['comment_count'], 1)
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword', bio='A long bio')
+        self.post = Post.objects.create(author=self.user, content='Hello')
+        self.post.add_like(self.user)
+
+    def test_author_is_an_id_unless_expanded(self):
+        data = self.client.get(reverse('post-detail', args=[self.post.id])).data
+        self.assertEqual(data['author'], self.user.id)
+        self.assertNotIn('likes', data)
+
+        data = self.client.get(reverse('post-detail', args=[self.post.id]), {'expand': 'author,likes'}).data
+        self.assertEqual(data['author']['bio'], 'A long bio')
+        self.assertEqual(data['likes'], [self.user.id])
+
+    def test_fields_selects_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'), {'fields': 'content'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'content', 'liked'})
+        select = queries.captured_queries[0]['sql']
+        self.assertIn('"posts_post"."content"', select)
+        self.assertNotIn('"posts_post"."image"', select)
+        self.assertNotIn('users_user', select)
+
+    def test_expanded_author_is_joined_in_the_same_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'), {'fields': 'content,author', 'expand': 'author'})
+        self.assertEqual(response.data['results'][0]['author']['username'], 'testuser')
+        self.assertEqual(len([q for q in queries.captured_queries if 'users_user' in q['sql']]), 1)
+
+
+class PostPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+
+    def test_cursor_walks_feed_without_gaps_or_duplicates(self):
+        posts = [Post.objects.create(author=self.user, content=f'Post {i}') for i in range(5)]
+        # Ties on created_at must be broken by id.
+        Post.objects.filter(id__in=[posts[1].id, posts[2].id, posts[3].id]).update(created_at=posts[1].created_at)
+
+        seen = []
+        url = reverse('post-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('post-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, content='Counted post')
+
+    def test_like_is_counted_once_per_user(self):
+        url = reverse('like-post', args=[self.post.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['liked'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_comments_update_post_counter(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, content='First')
+        Comment.objects.create(post=self.post, author=self.user, content='Second')
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_reconcile_counters_fixes_drift(self):
+        self.post.likes.add(self.user)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 0)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, content='Viral post')
+
+    def comment(self, content, parent=None):
+        return Comment.objects.create(post=self.post, author=self.user, content=content, parent=parent)
+
+    def test_reply_through_the_api(self):
+        parent = self.comment('Root')
+        response = self.client.post(reverse('comment-list'), {'parent': parent.id, 'content': 'Reply'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['post'], response.data['depth']), (self.post.id, 1))
+        parent.refresh_from_db()
+        self.assertEqual(parent.replies_count, 1)
+
+        other = Post.objects.create(author=self.user, content='Other post')
+        response = self.client.post(reverse('comment-list'), {'post': other.id, 'parent': parent.id, 'content': 'Wrong'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tree_loads_levels_in_constant_queries(self):
+        for i in range(3):
+            root = self.comment(f'Root {i}')
+            for j in range(5):
+                reply = self.comment(f'Reply {i}.{j}', root)
+                self.comment(f'Nested {i}.{j}', reply)
+        # Roots, two reply levels, and the viewer's likes.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('post-comments', args=[self.post.id]), {'page_size': 2})
+        roots = response.data['results']
+        self.assertEqual([c['content'] for c in roots], ['Root 0', 'Root 1'])
+        self.assertEqual([c['content'] for c in roots[0]['replies']], ['Reply 0.0', 'Reply 0.1', 'Reply 0.2'])
+        self.assertEqual(roots[0]['replies_count'], 5)
+        self.assertEqual([c['content'] for c in roots[0]['replies'][1]['replies']], ['Nested 0.1'])
+
+        response = self.client.get(response.data['next'] + '&depth=1')
+        self.assertEqual([(c['content'], c['replies']) for c in response.data['results']], [('Root 2', [])])
+
+    def test_replies_are_paginated_per_thread(self):
+        root = self.comment('Root')
+        replies = [self.comment(f'Reply {i}', root).id for i in range(5)]
+        response = self.client.get(reverse('comment-replies', args=[root.id]), {'page_size': 3})
+        self.assertEqual([c['id'] for c in response.data['results']], replies[:3])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([c['id'] for c in response.data['results']], replies[3:])
+
+    def test_deleting_a_thread_updates_counters(self):
+        root = self.comment('Root')
+        reply = self.comment('Reply', root)
+        self.comment('Nested', reply)
+        reply.delete()
+        self.post.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual((self.post.comments_count, root.replies_count), (1, 0))
+
+
+class LikeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, content='Likeable post')
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='Likeable comment')
+
+    def test_repeated_like_writes_nothing(self):
+        url = reverse('like-post', args=[self.post.id])
+        self.client.post(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in queries))
+
+    def test_unlike_is_idempotent(self):
+        self.post.add_like(self.user)
+        url = reverse('like-post', args=[self.post.id])
+        self.client.delete(url)
+        response = self.client.delete(url)
+        self.assertFalse(response.data['liked'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_like_and_unlike(self):
+        self.client.post(reverse('like-comment', args=[self.comment.id]))
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 1)
+        self.client.post(reverse('unlike-comment', args=[self.comment.id]))
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 0)
+
+    def test_like_missing_post(self):
+        response = self.client.post(reverse('like-post', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_like_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(reverse('like-post', args=[self.post.id]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_feed_marks_viewer_likes(self):
+        other = Post.objects.create(author=self.user, content='Not liked')
+        self.post.add_like(self.user)
+        response = self.client.get(reverse('post-list'))
+        liked = {post['id']: post['liked'] for post in response.data['results']}
+        self.assertEqual(liked, {self.post.id: True, other.id: False})
+
+
+@override_settings(TIMELINE_FANOUT_EAGER=True)
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.viewer = User.objects.create_user(username='viewer', email='viewer@example.com', password='testpassword')
+        self.friend = User.objects.create_user(username='friend', email='friend@example.com', password='testpassword')
+        self.stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='testpassword')
+        self.club = User.objects.create_user(username='club', email='club@example.com', password='testpassword')
+        self.friend.followers.add(self.viewer)
+        self.club.followers.add(self.viewer)
+        # Popular enough to be read on demand rather than fanned out.
+        User.objects.filter(pk=self.club.pk).update(followers_count=10_000)
+        self.club.refresh_from_db()
+        self.client.force_authenticate(user=self.viewer)
+
+    def publish(self, author, content):
+        self.client.force_authenticate(user=author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('post-list'), {'content': content})
+        self.client.force_authenticate(user=self.viewer)
+        return response.data['id']
+
+    def test_timeline_contains_followed_accounts_only(self):
+        friend_post = self.publish(self.friend, 'From a friend')
+        self.publish(self.stranger, 'From a stranger')
+        club_post = Post.objects.create(author=self.club, content='From the club').id
+        own_post = self.publish(self.viewer, 'My own post')
+
+        response = self.client.get(reverse('post-timeline'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data['results']], [own_post, club_post, friend_post])
+
+    def test_fan_out_skips_pull_authors(self):
+        fan_out(Post.objects.create(author=self.club, content='Announcement'))
+        self.assertFalse(TimelineEntry.objects.filter(author=self.club).exists())
+        fan_out(Post.objects.create(author=self.friend, content='Hello'))
+        owners = set(TimelineEntry.objects.filter(author=self.friend).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.friend.id, self.viewer.id})
+
+    @override_settings(TIMELINE_PULL_FOLLOWERS=2)
+    def test_pull_mode_follows_the_follower_count(self):
+        organization = User.objects.create_user(
+            username='small-club', email='small-club@example.com', password='testpassword', user_type='organization'
+        )
+        fan_out(Post.objects.create(author=organization, content='Few followers'))
+        self.assertTrue(TimelineEntry.objects.filter(author=organization).exists())
+
+        self.stranger.followers.add(self.viewer, self.friend)
+        User.objects.filter(pk=self.stranger.pk).update(followers_count=2)
+        self.stranger.refresh_from_db()
+        fan_out(Post.objects.create(author=self.stranger, content='Popular student'))
+        self.assertFalse(TimelineEntry.objects.filter(author=self.stranger).exists())
+        self.assertEqual(set(pull_author_ids(self.viewer)), {self.club.id, self.stranger.id})
+
+    def test_timeline_pages_across_push_and_pull_sources(self):
+        expected = []
+        for i in range(3):
+            expected.append(self.publish(self.friend, f'Friend {i}'))
+            expected.append(Post.objects.create(author=self.club, content=f'Club {i}').id)
+        seen = []
+        url = reverse('post-timeline') + '?page_size=4'
+        while url:
+            response = self.client.get(url)
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected[::-1])
+
+    @override_settings(TIMELINE_FANOUT_EAGER=False)
+    def test_followers_are_fanned_out_off_the_request(self):
+        with mock.patch('apps.posts.timeline._fan_out_pool') as pool:
+            post_id = self.publish(self.friend, 'Hello')
+        # The author sees their post at once; followers get it from the worker.
+        owners = set(TimelineEntry.objects.filter(post_id=post_id).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.friend.id})
+        pool.return_value.submit.assert_called_once_with(timeline._run_fan_out, post_id)
+        fan_out(Post.objects.get(pk=post_id))
+        owners = set(TimelineEntry.objects.filter(post_id=post_id).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.friend.id, self.viewer.id})
+
+    def test_follow_backfills_and_unfollow_cleans_up(self):
+        stranger_post = self.publish(self.stranger, 'Before the follow')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('follow', args=[self.stranger.id]))
+        ids = [post['id'] for post in self.client.get(reverse('post-timeline')).data['results']]
+        self.assertIn(stranger_post, ids)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('unfollow', args=[self.stranger.id]))
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.viewer, author=self.stranger).exists())
+
+
+class PostCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.post = Post.objects.create(author=self.user, content='Cached post')
+
+    def test_repeated_reads_are_served_from_cache(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['content'], 'Cached post')
+        self.client.get(reverse('post-list'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('post-list'))
+
+    def test_like_invalidates_cached_post(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.client.get(url)
+        self.client.get(reverse('post-list'))
+        self.post.add_like(self.user)
+        self.assertEqual(self.client.get(url).data['like_count'], 1)
+        self.assertEqual(self.client.get(reverse('post-list')).data['results'][0]['like_count'], 1)
+
+    def test_new_comment_invalidates_cached_post(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.user, content='Fresh')
+        self.assertEqual(self.client.get(url).data['comment_count'], 1)
+
+    def test_author_change_invalidates_embedded_copies(self):
+        group = StudyGroup.objects.create(name='Group', subject='Test', description='Test', max_members=10)
+        StudyGroup.objects.join(group.id, self.user.id)
+        self.client.force_authenticate(user=self.user)
+        post_url = reverse('post-detail', args=[self.post.id]) + '?expand=author'
+        group_url = reverse('studygroup-detail', args=[group.id])
+        self.client.get(post_url)
+        self.client.get(group_url)
+
+        self.user.firstname = 'Renamed'
+        self.user.save()
+        self.assertEqual(self.client.get(post_url).data['author']['firstname'], 'Renamed')
+        self.assertEqual(self.client.get(group_url).data['member_preview'][0]['firstname'], 'Renamed')
+
+    def test_viewer_flag_is_not_shared_through_the_cache(self):
+        url = reverse('post-detail', args=[self.post.id])
+        self.post.add_like(self.user)
+        self.client.force_authenticate(user=self.user)
+        self.assertTrue(self.client.get(url).data['liked'])
+        self.client.force_authenticate(user=None)
+        self.assertFalse(self.client.get(url).data['liked'])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PIPELINE_EAGER=True, TIMELINE_FANOUT_EAGER=True)
+class PostImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, size=(2000, 1000)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_generates_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('post-list'), {'content': 'Look', 'image': self.upload()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post = Post.objects.get()
+        self.assertEqual(post.image_renditions['source'], post.image.name)
+        with default_storage.open(post.image_renditions['thumb']['webp']) as thumb:
+            self.assertEqual(max(Image.open(thumb).size), 160)
+
+        data = self.client.get(reverse('post-detail', args=[post.id])).data
+        self.assertEqual(set(data['image_renditions']), {'thumb', 'medium', 'full'})
+        self.assertTrue(data['image_renditions']['medium']['jpeg'].endswith('.jpeg'))
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=1024)
+    def test_oversized_upload_is_rejected(self):
+        response = self.client.post(reverse('post-list'), {'content': 'Big', 'image': self.upload()}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', response.data)
+
+
+class PerformanceMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        for i in range(3):
+            Post.objects.create(author=self.user, content=f'Post {i}')
+
+    def test_request_is_timed_logged_and_exported(self):
+        with self.assertLogs('campus_cartel.performance', level='INFO') as logs:
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        record = logs.records[-1]
+        self.assertEqual(record.view, 'post-list')
+        self.assertGreater(record.queries, 0)
+        self.assertEqual(record.duplicate_queries, 0)
+
+        exported = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_request_db_queries_count{view="post-list",method="GET"}', exported)
+        self.assertIn('http_requests_total{view="post-list",method="GET",status="200"}', exported)
+        self.assertIn('api_cache_requests_total{namespace="post",outcome="misses"}', exported)
+
+    def test_repeated_statements_are_flagged(self):
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics.record_query):
+            for post in Post.objects.all():
+                User.objects.get(pk=post.author_id)
+        self.assertEqual(metrics.queries, 4)
+        self.assertEqual(metrics.duplicate_queries, 2)
+        self.assertIn('users_user', metrics.most_repeated())
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpassword')
+        self.posts = [Post.objects.create(author=self.user, content=f'Post {i}') for i in range(3)]
+        self.posts[0].add_like(self.user)
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        self.client = AsyncClient()
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def read_both_ways(self, url):
+        with self.settings(ASYNC_READ_VIEWS=False):
+            expected = await self.client.get(url, headers=self.headers)
+        cache.clear()
+        return expected, await self.client.get(url, headers=self.headers)
+
+    async def test_post_list_and_detail_match_the_sync_views(self):
+        for url in [f"{reverse('post-list')}?page_size=2&expand=author", reverse('post-detail', args=[self.posts[0].id])]:
+            expected, response = await self.read_both_ways(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json(), expected.json())
+            self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+        response = await self.client.get(reverse('post-detail', args=[self.posts[0].id]), headers=self.headers)
+        self.assertTrue(response.json()['liked'])
+        response = await self.client.get(reverse('post-detail', args=[self.posts[-1].id + 100]), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_writes_still_use_the_sync_view(self):
+        response = await self.client.post(reverse('post-list'), {'content': 'Anonymous'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class IndexAdvisorTests(TestCase):
+    def test_key_querysets_use_indexes(self):
+        out = StringIO()
+        call_command('index_advisor', stdout=out)
+        self.assertIn('posts-by-author: ok', out.getvalue())
+
+    def test_scans_and_sorts_are_recognized(self):
+        sqlite = '3 0 0 SCAN groups_message\n5 0 0 SCAN posts_post USING INDEX post_created_idx\n9 0 0 USE TEMP B-TREE FOR ORDER BY'
+        self.assertEqual(plan_problems('sqlite', sqlite), [('full scan', 'groups_message'), ('filesort', None)])
+        mysql = '1 SIMPLE posts_post None ALL None None None None 1000 100.0 Using filesort'
+        self.assertEqual(plan_problems('mysql', mysql), [('full scan', 'posts_post'), ('filesort', None)])
+        postgresql = 'Limit  (cost=1.0..2.0 rows=21 width=8)\n  ->  Sort  (cost=1.0..1.5 rows=50 width=8)\n        ->  Seq Scan on posts_post  (cost=0.0..1.0 rows=50 width=8)'
+        self.assertEqual(plan_problems('postgresql', postgresql), [('filesort', None), ('full scan', 'posts_post')])
+        self.assertEqual(plan_problems('sqlite', '2 0 0 SEARCH posts_post USING INDEX post_author_created_idx (author_id=?)'), [])
@@ -0,0 +1,134 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from apps.users.models import User
+from .models import Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+FANOUT_BATCH_SIZE = 1000
+# Recent posts copied into a timeline when its owner follows someone.
+FOLLOW_BACKFILL_SIZE = 50
+
+
+def _pull_threshold():
+    return getattr(settings, 'TIMELINE_PULL_FOLLOWERS', 5000)
+
+
+def is_pull_author(user):
+    # Posts by accounts with a large part of campus as followers are merged in
+    # when a timeline is read instead of copied to every follower.
+    return user.followers_count >= _pull_threshold()
+
+
+def fan_out(post):
+    """Copy a new post into the timelines of its author and their followers."""
+    author = post.author
+    if is_pull_author(author):
+        return
+
+    def entry(owner_id):
+        return TimelineEntry(owner_id=owner_id, post=post, author_id=author.id, created_at=post.created_at)
+
+    follower_ids = User.followers.through.objects.filter(from_user_id=author.id).values_list('to_user_id', flat=True)
+    batch = [entry(author.id)]
+    for follower_id in follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(entry(follower_id))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+@lru_cache
+def _fan_out_pool():
+    return ThreadPoolExecutor(max_workers=getattr(settings, 'TIMELINE_FANOUT_WORKERS', 2), thread_name_prefix='fan-out')
+
+
+def _run_fan_out(post_id):
+    close_old_connections()
+    try:
+        post = Post.objects.select_related('author').filter(pk=post_id).first()
+        if post is not None:
+            fan_out(post)
+    except Exception:
+        logger.exception("Fanning out post %s failed", post_id)
+    finally:
+        close_old_connections()
+
+
+def publish(post):
+    """
+    Fan out a just-committed post. Only the author's own entry is written on
+    the request path; the followers' are written in batches by a background
+    worker, so a post's cost no longer grows with its author's following.
+    """
+    if is_pull_author(post.author):
+        return
+    if getattr(settings, 'TIMELINE_FANOUT_EAGER', False):
+        fan_out(post)
+        return
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=post.author_id, post=post, author_id=post.author_id, created_at=post.created_at)],
+        ignore_conflicts=True,
+    )
+    _fan_out_pool().submit(_run_fan_out, post.pk)
+
+
+def follow_backfill(owner_id, author_id):
+    """Copy the recent posts of a newly followed push-mode account into ``owner_id``'s timeline."""
+    posts = list(Post.objects.filter(author_id=author_id).select_related('author').order_by('-created_at', '-id')[:FOLLOW_BACKFILL_SIZE])
+    if not posts or is_pull_author(posts[0].author):
+        return
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id, post=post, author_id=author_id, created_at=post.created_at) for post in posts],
+        ignore_conflicts=True,
+    )
+
+
+def unfollow_cleanup(owner_id, author_id):
+    """Drop an unfollowed account's posts from ``owner_id``'s timeline."""
+    TimelineEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+
+def pull_author_ids(user):
+    # Must select the same accounts as is_pull_author().
+    ids = list(User.objects.filter(followers=user, followers_count__gte=_pull_threshold()).values_list('id', flat=True))
+    if is_pull_author(user):
+        ids.append(user.id)
+    return ids
+
+
+def _after(position, time_field, id_field):
+    created_at, post_id = position
+    return Q(**{f'{time_field}__lt': created_at}) | Q(**{time_field: created_at, f'{id_field}__lt': post_id})
+
+
+def read_timeline(user, position, limit):
+    """
+    Return up to ``limit`` posts for ``user``'s home timeline, newest first,
+    starting after the (created_at, id) ``position``.
+
+    Pushed posts come from one range scan of the owner's timeline entries;
+    posts by followed pull-mode accounts are read from their authors' posts
+    and merged in.
+    """
+    entries = TimelineEntry.objects.filter(owner=user).select_related('post__author')
+    if position is not None:
+        entries = entries.filter(_after(position, 'created_at', 'post_id'))
+    posts = {entry.post.id: entry.post for entry in entries.order_by('-created_at', '-post_id')[:limit]}
+
+    pulled_from = pull_author_ids(user)
+    if pulled_from:
+        pulled = Post.objects.filter(author_id__in=pulled_from).select_related('author')
+        if position is not None:
+            pulled = pulled.filter(_after(position, 'created_at', 'id'))
+        for post in pulled.order_by('-created_at', '-id')[:limit]:
+            posts.setdefault(post.id, post)
+
+    return sorted(posts.values(), key=lambda post: (post.created_at, post.id), reverse=True)[:limit]
@@ -1,15 +1,19 @@
 from django.urls import path
 from .views import (
-    PostListView, PostDetailView, CommentListView, CommentDetailView,
-    LikePostView, LikeCommentView, UnlikeCommentView
+    AsyncPostListView, TimelineView, AsyncPostDetailView, CommentListView, CommentDetailView, CommentTreeView, CommentRepliesView,
+    LikePostView, UnlikePostView, LikeCommentView, UnlikeCommentView
 )
 
 urlpatterns = [
-    path('', PostListView.as_view(), name='post-list'),
-    path('<int:id>/', PostDetailView.as_view(), name='post-detail'),
+    path('', AsyncPostListView.as_view(), name='post-list'),
+    path('timeline/', TimelineView.as_view(), name='post-timeline'),
+    path('<int:id>/', AsyncPostDetailView.as_view(), name='post-detail'),
+    path('<int:id>/comments/', CommentTreeView.as_view(), name='post-comments'),
     path('comments/', CommentListView.as_view(), name='comment-list'),
     path('comments/<int:pk>/', CommentDetailView.as_view(), name='comment-detail'),
+    path('comments/<int:pk>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
     path('<int:id>/like/', LikePostView.as_view(), name='like-post'),
+    path('<int:id>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
     path('comments/<int:pk>/like/', LikeCommentView.as_view(), name='like-comment'),
     path('comments/<int:pk>/unlike/', UnlikeCommentView.as_view(), name='unlike-comment'),
 ]
\ No newline at end of file
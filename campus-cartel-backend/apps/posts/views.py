@@ -1,31 +1,87 @@
-from rest_framework import generics
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny , IsAuthenticated
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
 from .models import Post, Comment
+from . import timeline
 from .serializers import PostSerializer, CommentSerializer
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
-
-
-class PostListView(generics.ListCreateAPIView):
-    queryset = Post.objects.all()
+from campus_cartel.asyncviews import AsyncListView, AsyncRetrieveView
+from campus_cartel.cache import CachedListMixin, CachedRetrieveMixin
+from campus_cartel.pagination import PostPagination, CommentPagination
+from campus_cartel.sparse import SparseQuerysetMixin
+
+
+class ViewerLikesMixin:
+    """Adds a ``liked`` flag for the requesting user, one query per page."""
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        self.mark_liked(response.data['results'] if isinstance(response.data, dict) else response.data)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        self.mark_liked([response.data])
+        return response
+
+    def mark_liked(self, items):
+        liked = set()
+        if self.request.user.is_authenticated and items:
+            model = self.get_serializer_class().Meta.model
+            liked = model.objects.liked_ids(self.request.user.id, [item['id'] for item in items])
+        for item in items:
+            item['liked'] = item['id'] in liked
+
+    async def amark_liked(self, items):
+        liked = set()
+        if self.request.user.is_authenticated and items:
+            model = self.get_serializer_class().Meta.model
+            liked = await model.objects.aliked_ids(self.request.user.id, [item['id'] for item in items])
+        for item in items:
+            item['liked'] = item['id'] in liked
+
+class PostListView(SparseQuerysetMixin, ViewerLikesMixin, CachedListMixin, generics.ListCreateAPIView):
+    queryset = Post.objects.for_feed()
     serializer_class = PostSerializer
+    cache_namespace = 'post'
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PostPagination
     lookup_field = 'id'
 
     def perform_create(self, serializer):
         user = self.request.user
-        print('DEBUG USER:', user, user.id, getattr(user, 'user_type', None))
         if user.is_authenticated and getattr(user, 'user_type', None) == 'student':
-            serializer.save(author=user)
+            post = serializer.save(author=user)
+            transaction.on_commit(lambda: timeline.publish(post))
         else:
             raise ValidationError("Only authenticated students can create posts.")
 
-class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+class TimelineView(ViewerLikesMixin, generics.ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = PostPagination
+
+    def list(self, request, *args, **kwargs):
+        posts = self.paginator.paginate_with(
+            request, Post, lambda position, limit: timeline.read_timeline(request.user, position, limit)
+        )
+        serializer = self.get_serializer(posts, many=True)
+        prefetch_related_objects(posts, *[name for name in ('likes', 'shares') if name in serializer.child.fields])
+        response = self.get_paginated_response(serializer.data)
+        self.mark_liked(response.data['results'])
+        return response
+
+class PostDetailView(SparseQuerysetMixin, ViewerLikesMixin, CachedRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Post.objects.for_feed()
     serializer_class = PostSerializer
+    cache_namespace = 'post'
     permission_classes = [AllowAny]
+    lookup_field = 'id'
 
     def perform_update(self, serializer):
         serializer.save()
@@ -33,15 +89,33 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     def perform_destroy(self, instance):
         instance.delete()
 
-class CommentListView(generics.ListCreateAPIView):
+class AsyncPostListView(AsyncListView):
+    view_class = PostListView
+
+    async def read(self, view, request):
+        data = await super().read(view, request)
+        await view.amark_liked(data['results'])
+        return data
+
+class AsyncPostDetailView(AsyncRetrieveView):
+    view_class = PostDetailView
+
+    async def read(self, view, request):
+        data = await super().read(view, request)
+        await view.amark_liked([data])
+        return data
+
+class CommentListView(SparseQuerysetMixin, ViewerLikesMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
 
     def get_queryset(self):
         post_id = self.request.query_params.get('post')
+        queryset = Comment.objects.for_feed()
         if post_id:
-            return Comment.objects.filter(post_id=post_id)
-        return Comment.objects.all()
+            return queryset.filter(post_id=post_id)
+        return queryset
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -49,51 +123,116 @@ class CommentListView(generics.ListCreateAPIView):
             serializer.save(author=user)
         else:
             raise ValidationError("Authentication required to comment.")
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Comment.objects.all()
+class CommentTreeView(SparseQuerysetMixin, ViewerLikesMixin, generics.ListAPIView):
+    """
+    A post's comment threads: ``/api/posts/<id>/comments/?depth=<n>``.
+
+    Top-level comments are cursor-paginated. Each carries its first
+    ``reply_preview_size`` replies under ``replies``, down to ``depth``
+    levels; longer threads continue at ``comment-replies``. One query per
+    level, however large the post's comment section is.
+    """
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+    default_depth = 3
+    max_depth = 5
+    reply_preview_size = 3
+
+    def get_queryset(self):
+        return Comment.objects.for_feed()
+
+    def get_depth(self):
+        try:
+            depth = int(self.request.query_params.get('depth', self.default_depth))
+        except ValueError:
+            raise ValidationError("'depth' must be an integer.")
+        return max(1, min(depth, self.max_depth))
+
+    def list(self, request, *args, **kwargs):
+        comments = self.filter_queryset(self.get_queryset())
+        level = self.paginate_queryset(comments.filter(post_id=self.kwargs['id'], parent=None))
+        if not level:
+            get_object_or_404(Post, pk=self.kwargs['id'])
+        loaded = list(level)
+        roots = len(loaded)
+        for _ in range(self.get_depth() - 1):
+            if not level:
+                break
+            level = list(comments.first_replies([comment.id for comment in level], self.reply_preview_size).order_by('created_at', 'id'))
+            loaded.extend(level)
+
+        items = self.get_serializer(loaded, many=True).data
+        by_id = {}
+        for comment, item in zip(loaded, items):
+            item['replies'] = []
+            by_id[comment.id] = item
+            if comment.parent_id in by_id:
+                by_id[comment.parent_id]['replies'].append(item)
+        self.mark_liked(items)
+        return self.get_paginated_response(items[:roots])
+
+class CommentRepliesView(SparseQuerysetMixin, ViewerLikesMixin, generics.ListAPIView):
+    """Direct replies to a comment, oldest first and cursor-paginated."""
+    serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+
+    def get_queryset(self):
+        return Comment.objects.for_feed().filter(parent_id=self.kwargs['pk'])
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not response.data['results']:
+            get_object_or_404(Comment, pk=self.kwargs['pk'])
+        return response
+
+class CommentDetailView(SparseQuerysetMixin, ViewerLikesMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Comment.objects.for_feed()
     serializer_class = CommentSerializer
     permission_classes = [AllowAny]
 
     def perform_update(self, serializer):
         serializer.save()
 
-class LikePostView(APIView):
-    permission_classes = [AllowAny]
+class LikeView(APIView):
+    """POST likes, DELETE unlikes; repeating either is a no-op."""
+    permission_classes = [IsAuthenticated]
+    model = None
 
-    def post(self, request, pk):
-        post = Post.objects.get(pk=pk)
-        post.likes_count = getattr(post, 'likes_count', 0) + 1
-        post.save()
-        return Response({'likes': post.likes_count})
+    def like(self, pk):
+        try:
+            liked = self.model.objects.add_like(pk, self.request.user.id)
+        except self.model.DoesNotExist:
+            raise NotFound()
+        return Response({'liked': True}, status=status.HTTP_201_CREATED if liked else status.HTTP_200_OK)
 
-class LikeCommentView(APIView):
-    permission_classes = [AllowAny]
+    def unlike(self, pk):
+        self.model.objects.remove_like(pk, self.request.user.id)
+        return Response({'liked': False})
 
-    def post(self, request, pk):
-        comment = Comment.objects.get(pk=pk)
-        comment.likes_count = getattr(comment, 'likes_count', 0) + 1
-        comment.save()
-        return Response({'likes': comment.likes_count})
+class LikePostView(LikeView):
+    model = Post
 
-    def delete(self, request, pk):
-        comment = Comment.objects.get(pk=pk)
-        comment.likes_count = max(getattr(comment, 'likes_count', 1) - 1, 0)
-        comment.save()
-        return Response({'likes': comment.likes_count})
+    def post(self, request, id):
+        return self.like(id)
 
-class LikeCommentView(APIView):
-    permission_classes = [IsAuthenticated]
+    def delete(self, request, id):
+        return self.unlike(id)
+
+class UnlikePostView(LikePostView):
+
+    def post(self, request, id):
+        return self.unlike(id)
+
+class LikeCommentView(LikeView):
+    model = Comment
 
     def post(self, request, pk):
-        comment = Comment.objects.get(pk=pk)
-        comment.likes = getattr(comment, 'likes', 0) + 1
-        comment.save()
-        return Response({'likes': comment.likes})
-class UnlikeCommentView(APIView):
-    permission_classes = [IsAuthenticated]
+        return self.like(pk)
+
+    def delete(self, request, pk):
+        return self.unlike(pk)
+
+class UnlikeCommentView(LikeCommentView):
 
     def post(self, request, pk):
-        comment = Comment.objects.get(pk=pk)
-        comment.likes = max(getattr(comment, 'likes', 1) - 1, 0)
-        comment.save()
-        return Response({'likes': comment.likes})
\ No newline at end of file
+        return self.unlike(pk)
@@ -0,0 +1,115 @@
+import math
+import re
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models.functions import Cast, Round
+from .models import SearchPosting
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+# Scores are ranked as integers at this resolution: sums of float weights can
+# differ in their last bits between queries, which would break cursor seeks.
+RANK_SCALE = 1_000_000
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'with',
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if len(token) > 1 and token not in STOPWORDS:
+            tokens.append(token[:MAX_TERM_LENGTH])
+    return tokens
+
+
+def document_fields(doc_type, obj):
+    """(text, boost) pairs that make up the searchable text of an object."""
+    if doc_type == 'post':
+        return [(obj.content, 1.0)]
+    if doc_type == 'comment':
+        return [(obj.content, 1.0)]
+    if doc_type == 'group':
+        return [(obj.name, 3.0), (obj.subject, 2.0), (obj.description, 1.0)]
+    if doc_type == 'user':
+        return [
+            (obj.username, 3.0), (obj.firstname, 2.0), (obj.lastname, 2.0),
+            (obj.university, 1.0), (obj.major, 1.0),
+        ]
+    raise ValueError(f"Unknown document type: {doc_type}")
+
+
+def term_weights(fields):
+    # Log-scaled, field-boosted term frequency, normalized by document length
+    # so long posts don't outrank short ones just by repeating words.
+    counts = Counter()
+    length = 0
+    for text, boost in fields:
+        tokens = tokenize(text)
+        length += len(tokens)
+        for token in tokens:
+            counts[token] += boost
+    norm = math.sqrt(length) if length else 1.0
+    return {term: (1 + math.log(count)) / norm for term, count in counts.items()}
+
+
+def postings_for(doc_type, obj):
+    return [
+        SearchPosting(term=term, doc_type=doc_type, doc_id=obj.pk, weight=weight)
+        for term, weight in term_weights(document_fields(doc_type, obj)).items()
+    ]
+
+
+def index_document(doc_type, obj):
+    with transaction.atomic():
+        remove_document(doc_type, obj.pk)
+        SearchPosting.objects.bulk_create(postings_for(doc_type, obj))
+
+
+def remove_document(doc_type, doc_id):
+    SearchPosting.objects.filter(doc_type=doc_type, doc_id=doc_id).delete()
+
+
+def search_queryset(query, doc_types=None, max_terms=8):
+    """
+    Documents matching every term of ``query`` as (doc_type, doc_id, score,
+    rank) rows. The word the user is still typing (the last one, unless the
+    query ends in a separator) matches as a prefix so results show up early.
+    """
+    words = TOKEN_RE.findall(query.lower())
+    prefix = None
+    if words and TOKEN_RE.match(query[-1:]):
+        prefix = words.pop()[:MAX_TERM_LENGTH]
+        # One letter matches too much to be worth a scan.
+        if len(prefix) < 2:
+            prefix = None
+    terms = list(dict.fromkeys(tokenize(' '.join(words))))
+    if prefix is not None and any(term.startswith(prefix) for term in terms):
+        # Already satisfied by a complete word.
+        prefix = None
+    terms = terms[:max_terms - 1] if prefix is not None else terms[:max_terms]
+
+    conditions = [models.Q(term=term) for term in terms]
+    if prefix is not None:
+        conditions.append(models.Q(term__startswith=prefix))
+    if not conditions:
+        return SearchPosting.objects.none()
+    matched_term = models.Case(
+        *[models.When(condition, then=models.Value(i)) for i, condition in enumerate(conditions)],
+        output_field=models.IntegerField(),
+    )
+    any_term = models.Q()
+    for condition in conditions:
+        any_term |= condition
+
+    postings = SearchPosting.objects.filter(any_term)
+    if doc_types:
+        postings = postings.filter(doc_type__in=doc_types)
+    return (
+        postings.values('doc_type', 'doc_id')
+        .annotate(score=models.Sum('weight'), matched=models.Count(matched_term, distinct=True))
+        .annotate(rank=Cast(Round(models.F('score') * RANK_SCALE), models.BigIntegerField()))
+        .filter(matched=len(conditions))
+    )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.groups.models import StudyGroup
+from apps.posts.models import Post, Comment
+from apps.search.index import postings_for
+from apps.search.models import SearchPosting
+from apps.users.models import User
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        SearchPosting.objects.all().delete()
+        for doc_type, model in (('post', Post), ('comment', Comment), ('group', StudyGroup), ('user', User)):
+            batch = []
+            total = 0
+            for obj in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.extend(postings_for(doc_type, obj))
+                total += 1
+                if len(batch) >= batch_size:
+                    SearchPosting.objects.bulk_create(batch, batch_size=batch_size)
+                    batch = []
+            SearchPosting.objects.bulk_create(batch, batch_size=batch_size)
+            self.stdout.write(f"{doc_type}: {total} documents indexed")
+
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt successfully!"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('doc_type', models.CharField(choices=[('post', 'Post'), ('comment', 'Comment'), ('group', 'Study group'), ('user', 'User')], max_length=10)),
+                ('doc_id', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doc_type', 'doc_id'], name='search_posting_doc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('term', 'doc_type', 'doc_id'), name='search_posting_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class SearchPosting(models.Model):
+    """One term of one indexed document: a row of the inverted index."""
+    DOCUMENT_TYPES = [
+        ('post', 'Post'),
+        ('comment', 'Comment'),
+        ('group', 'Study group'),
+        ('user', 'User'),
+    ]
+
+    term = models.CharField(max_length=64)
+    doc_type = models.CharField(max_length=10, choices=DOCUMENT_TYPES)
+    doc_id = models.BigIntegerField()
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'doc_type', 'doc_id'], name='search_posting_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['doc_type', 'doc_id'], name='search_posting_doc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.doc_type}:{self.doc_id}"
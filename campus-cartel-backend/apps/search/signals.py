@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from apps.groups.models import StudyGroup
+from apps.posts.models import Post, Comment
+from apps.users.models import User
+from .index import index_document, remove_document
+
+INDEXED_MODELS = {
+    Post: 'post',
+    Comment: 'comment',
+    StudyGroup: 'group',
+    User: 'user',
+}
+
+
+def update_index(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    index_document(INDEXED_MODELS[sender], instance)
+
+
+def drop_from_index(sender, instance, **kwargs):
+    remove_document(INDEXED_MODELS[sender], instance.pk)
+
+
+for model in INDEXED_MODELS:
+    post_save.connect(update_index, sender=model, dispatch_uid=f'search-index-{model._meta.label}')
+    post_delete.connect(drop_from_index, sender=model, dispatch_uid=f'search-remove-{model._meta.label}')
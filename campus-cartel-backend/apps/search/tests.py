@@ -0,0 +1,77 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.groups.models import StudyGroup
+from apps.posts.models import Post
+from apps.search.models import SearchPosting
+from apps.users.models import User
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='testpassword')
+        self.url = reverse('search')
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_index_follows_saves_and_deletes(self):
+        post = Post.objects.create(author=self.user, content='Distributed systems reading list')
+        self.assertTrue(SearchPosting.objects.filter(doc_type='post', doc_id=post.id, term='distributed').exists())
+        post.content = 'Compilers reading list'
+        post.save()
+        self.assertFalse(SearchPosting.objects.filter(doc_type='post', doc_id=post.id, term='distributed').exists())
+        post.delete()
+        self.assertFalse(SearchPosting.objects.filter(doc_type='post', doc_id=post.id).exists())
+
+    def test_all_terms_must_match_and_last_term_is_a_prefix(self):
+        match = Post.objects.create(author=self.user, content='Linear algebra study session tonight')
+        Post.objects.create(author=self.user, content='Linear regression homework')
+        response = self.search('linear algeb', type='post')
+        self.assertEqual([result['object']['id'] for result in response.data['results']], [match.id])
+
+    def test_prefix_is_the_word_being_typed(self):
+        match = Post.objects.create(author=self.user, content='Linear algebra theory')
+        Post.objects.create(author=self.user, content='Linear algebra homework')
+        # "the" is a stopword once complete, but here it is the start of "theory".
+        response = self.search('linear algebra the', type='post')
+        self.assertEqual([result['object']['id'] for result in response.data['results']], [match.id])
+        response = self.search('algebra linear algebra', type='post')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_results_are_ranked(self):
+        group = StudyGroup.objects.create(name='Calculus', subject='Math', description='Weekly problems', max_members=10)
+        post = Post.objects.create(author=self.user, content='Anyone up for some calculus practice before the midterm on friday?')
+        response = self.search('calculus')
+        self.assertEqual(
+            [(result['type'], result['object']['id']) for result in response.data['results']],
+            [('group', group.id), ('post', post.id)],
+        )
+
+    def test_cursor_pages_through_results(self):
+        posts = [Post.objects.create(author=self.user, content=f'Physics notes {i}') for i in range(5)]
+        seen = []
+        url = self.url + '?q=physics&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(result['object']['id'] for result in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), [post.id for post in posts])
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_equal_scores_page_without_gaps_or_repeats(self):
+        posts = [Post.objects.create(author=self.user, content=f'Organic chemistry lab {i}') for i in range(4)]
+        seen = []
+        url = self.url + '?q=organic+chemistry+lab&page_size=1'
+        while url:
+            response = self.client.get(url)
+            seen.extend(result['object']['id'] for result in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [post.id for post in posts])
+
+    def test_query_is_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
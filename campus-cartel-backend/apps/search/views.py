@@ -0,0 +1,56 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+from apps.groups.models import StudyGroup
+from apps.groups.serializers import StudyGroupSerializer
+from apps.posts.models import Post, Comment
+from apps.posts.serializers import PostSerializer, CommentSerializer
+from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from campus_cartel.pagination import SearchPagination
+from .index import search_queryset
+
+DOCUMENTS = {
+    'post': (lambda: Post.objects.for_feed(), PostSerializer),
+    'comment': (lambda: Comment.objects.for_feed(), CommentSerializer),
+    'group': (lambda: StudyGroup.objects.with_member_preview(), StudyGroupSerializer),
+    'user': (lambda: User.objects.all(), UserSerializer),
+}
+
+
+class SearchView(APIView):
+    """
+    Full-text search: ``/api/search/?q=<terms>&type=post,group``.
+
+    Results are ranked by relevance and paged with an opaque cursor.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            raise ValidationError({'q': 'A search query is required.'})
+        types = [name for name in request.query_params.get('type', '').split(',') if name in DOCUMENTS]
+
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(search_queryset(query, types), request, view=self)
+
+        objects = {}
+        for doc_type, (queryset, _) in DOCUMENTS.items():
+            ids = [row['doc_id'] for row in rows if row['doc_type'] == doc_type]
+            if ids:
+                objects[doc_type] = queryset().in_bulk(ids)
+
+        results = []
+        for row in rows:
+            obj = objects.get(row['doc_type'], {}).get(row['doc_id'])
+            if obj is None:
+                continue
+            serializer_class = DOCUMENTS[row['doc_type']][1]
+            results.append({
+                'type': row['doc_type'],
+                'score': row['score'],
+                'object': serializer_class(obj, context={'request': request}).data,
+            })
+        return paginator.get_paginated_response(results)
@@ -0,0 +1,181 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from campus_cartel.cache import get_cache, is_shared_cache
+
+User = get_user_model()
+
+# Copied into every token so most requests never need the user row.
+CLAIMS = ('user_type', 'is_staff', 'is_superuser')
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def cached_user_values(user_id):
+    """The user's row (minus the password hash), cached for AUTH_USER_CACHE_TIMEOUT seconds."""
+    cache = get_cache()
+    values = cache.get(_user_key(user_id))
+    if values is None:
+        attnames = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+        values = User.objects.filter(pk=user_id).values(*attnames).first()
+        if values is None:
+            return None
+        cache.set(_user_key(user_id), values, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return values
+
+
+async def acached_user_values(user_id):
+    """``cached_user_values`` for async views."""
+    cache = get_cache()
+    values = await cache.aget(_user_key(user_id))
+    if values is None:
+        attnames = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+        values = await User.objects.filter(pk=user_id).values(*attnames).afirst()
+        if values is None:
+            return None
+        await cache.aset(_user_key(user_id), values, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return values
+
+
+def get_cached_user(user_id):
+    """A full ``User`` from the auth cache; only the password is loaded on demand."""
+    values = cached_user_values(user_id)
+    if values is None:
+        return None
+    return _from_values(values)
+
+
+async def aget_cached_user(user_id):
+    values = await acached_user_values(user_id)
+    if values is None:
+        return None
+    return _from_values(values)
+
+
+def _from_values(values):
+    # from_db() expects the values in field order; missing fields are deferred.
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(router.db_for_read(User), names, [values[name] for name in names])
+
+
+def invalidate_cached_user(user_id):
+    get_cache().delete(_user_key(user_id))
+
+
+class BlacklistCache:
+    """
+    Process-local set of the jtis of unexpired blacklisted tokens.
+
+    A shared version key tells each process when to reload it, so checking a
+    refresh token costs one cache read instead of a database query. With a
+    per-process cache another worker's blacklisting would go unnoticed, so
+    tokens are then checked against the database.
+    """
+    version_key = 'auth:blacklist-version'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._jtis = frozenset()
+
+    def _current_version(self):
+        cache = get_cache()
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, int(timezone.now().timestamp() * 1000), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def __contains__(self, jti):
+        if not is_shared_cache():
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        version = self._current_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._jtis = frozenset(
+                        BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+                        .values_list('token__jti', flat=True)
+                    )
+                    self._version = version
+        return jti in self._jtis
+
+    def invalidate(self):
+        cache = get_cache()
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, int(timezone.now().timestamp() * 1000), None)
+
+
+blacklist_cache = BlacklistCache()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying ``CLAIMS``; access tokens derived from it inherit them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_cache:
+            raise TokenError(_("Token is blacklisted"))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds ``request.user`` from the token's claims.
+
+    The user is a real ``User`` whose other fields are deferred; touching one
+    fills them all from the auth cache (see ``User.refresh_from_db``), so views
+    that only need the id or the user type run without a user query. Claim
+    changes (user type, staff flags, deactivation) reach requests once the
+    access token is refreshed.
+    """
+
+    async def aauthenticate(self, request):
+        """
+        ``authenticate`` for async views. Validating an access token is pure
+        CPU, so only tokens issued without the claims reach the database.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if any(claim not in validated_token for claim in CLAIMS):
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIMS):
+            # Issued before the claims were added.
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # Tokens are only issued to, and refreshed for, active users.
+        known = {'id': user_id, 'is_active': True, **{claim: validated_token[claim] for claim in CLAIMS}}
+        user = _from_values(known)
+        user.from_claims = True
+        return user
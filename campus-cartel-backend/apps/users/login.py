@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.crypto import get_random_string
+from campus_cartel.throttling import RateLimit
+from .authentication import ClaimsRefreshToken
+
+User = get_user_model()
+
+
+class LoginThrottled(Exception):
+    def __init__(self, wait):
+        self.wait = wait
+
+
+class LoginBusy(Exception):
+    """Every hashing slot is taken; the client should retry shortly."""
+
+
+def _rate_limit(scope):
+    limit, period = settings.LOGIN_THROTTLE_RATES[scope]
+    return RateLimit(f'login-{scope}', limit, period)
+
+
+@lru_cache
+def _hash_pool():
+    workers = getattr(settings, 'LOGIN_HASH_WORKERS', 4)
+    # Attempts beyond the workers plus a short queue are turned away instead
+    # of piling up behind PBKDF2.
+    slots = threading.BoundedSemaphore(workers + getattr(settings, 'LOGIN_HASH_QUEUE', 16))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hash'), slots
+
+
+@lru_cache
+def _dummy_hash():
+    # Unknown accounts are checked against this so they cost the same time.
+    return make_password(get_random_string(32))
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+async def verify_password(encoded, password):
+    """Check ``password`` in the bounded hashing pool; returns (valid, upgraded hash or None)."""
+    pool, slots = _hash_pool()
+    if not slots.acquire(blocking=False):
+        raise LoginBusy
+    upgraded = []
+    try:
+        valid = await asyncio.get_running_loop().run_in_executor(
+            pool, lambda: check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+        )
+    finally:
+        slots.release()
+    return valid, upgraded[0] if upgraded else None
+
+
+async def login(request, email, password):
+    """
+    Authenticate by email and password and return a fresh token pair, or
+    None for wrong credentials (an unknown email looks exactly the same).
+
+    Raises ``LoginThrottled`` when the client IP or the account is over its
+    limit: every attempt counts against the IP, only failures against the account.
+    """
+    email = (email or '').strip()
+    account = email.lower()
+    ip_limit, account_limit = _rate_limit('ip'), _rate_limit('account')
+    wait = await sync_to_async(ip_limit.consume)(client_ip(request))
+    if not wait:
+        wait = await sync_to_async(account_limit.wait)(account)
+    if wait:
+        raise LoginThrottled(wait)
+
+    user = await User.objects.filter(email=email).only('id', 'password', 'is_active', 'user_type', 'is_staff', 'is_superuser').afirst()
+    valid, upgraded = await verify_password(user.password if user else _dummy_hash(), password or '')
+    if not (user and valid and user.is_active):
+        await sync_to_async(account_limit.consume)(account)
+        return None
+
+    if upgraded:
+        await User.objects.filter(pk=user.pk).aupdate(password=upgraded)
+    refresh = await sync_to_async(ClaimsRefreshToken.for_user)(user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
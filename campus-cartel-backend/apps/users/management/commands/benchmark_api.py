@@ -0,0 +1,312 @@
+import asyncio
+import itertools
+import json
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.users.models import User
+from apps.posts.models import Post, Comment
+from apps.groups.models import Membership, StudyGroup, Message
+from .populate_db import SEED_PASSWORD
+
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+ENDPOINTS = [
+    'post-list', 'post-detail', 'post-timeline', 'comment-list', 'group-messages', 'user-profile', 'join-group', 'login',
+]
+
+
+class _Target:
+    """Sends requests either in-process or to a running server at ``base_url``."""
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.local = threading.local()
+        self.addresses = itertools.count(1)
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if self.base_url is None:
+            client = getattr(self.local, 'client', None)
+            if client is None:
+                # One address per client, like separate machines (login is throttled per IP).
+                number = next(self.addresses)
+                client = self.local.client = Client(HTTP_HOST='localhost', REMOTE_ADDR=f'10.0.{number // 256}.{number % 256}')
+            response = client.generic(
+                method, path, json.dumps(data) if data is not None else '', content_type='application/json',
+                headers=headers,
+            )
+            return response.status_code, response.get('Server-Timing', ''), response.content
+
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method,
+            headers={**headers, 'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers.get('Server-Timing', ''), response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get('Server-Timing', ''), error.read()
+
+
+class _AsgiTarget:
+    """
+    Sends requests through the ASGI handler in-process, all on one event loop
+    like a single ASGI worker.
+    """
+
+    def __init__(self):
+        self.client = AsyncClient()
+
+    async def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        # One thread per request for its sync work, as under an ASGI server.
+        async with ThreadSensitiveContext():
+            response = await self.client.generic(
+                method, path, json.dumps(data) if data is not None else '', content_type='application/json',
+                headers=headers,
+            )
+            await sync_to_async(connections.close_all)()
+        return response.status_code, response.get('Server-Timing', ''), response.content
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Drive the main API endpoints with concurrent clients and report latency, queries and throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help="Populate the database before running")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts-per-user', type=int, default=20)
+        parser.add_argument('--likes-per-post', type=int, default=10)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--messages-per-group', type=int, default=500)
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per endpoint")
+        parser.add_argument('--base-url',
+                            help="Benchmark a running server instead of an in-process client. Every request then "
+                                 "comes from this machine's address, so 'login' is held to the server's per-IP "
+                                 "LOGIN_THROTTLE_RATES and answers 429 past it")
+        parser.add_argument('--asgi', action='store_true',
+                            help="Run in-process through the ASGI handler, --clients requests at a time on one event loop")
+        parser.add_argument('--compare-async', action='store_true',
+                            help="With --asgi: run every endpoint with ASYNC_READ_VIEWS off, then on")
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare against a previous JSON result")
+        parser.add_argument('--max-regression', type=float, default=0.2,
+                            help="Allowed relative p95 increase before --baseline fails the run")
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            return self._benchmark(options)
+        # Every in-process client is this process; only the per-account limit
+        # stays, so 'login' measures logging in rather than the throttle.
+        _, period = settings.LOGIN_THROTTLE_RATES['ip']
+        unthrottled = {**settings.LOGIN_THROTTLE_RATES, 'ip': (10 ** 9, period)}
+        with override_settings(LOGIN_THROTTLE_RATES=unthrottled):
+            return self._benchmark(options)
+
+    def _benchmark(self, options):
+        if options['seed']:
+            call_command(
+                'populate_db', users=options['users'], posts_per_user=options['posts_per_user'],
+                likes_per_post=options['likes_per_post'], groups=options['groups'],
+                messages_per_group=options['messages_per_group'], stdout=self.stdout,
+            )
+
+        rng = random.Random(options['random_seed'])
+        students = list(User.objects.filter(user_type='student').order_by('?').values_list('email', flat=True)[:50])
+        post_ids = list(Post.objects.order_by('?').values_list('id', flat=True)[:200])
+        group_ids = list(StudyGroup.objects.order_by('?').values_list('id', flat=True)[:50])
+        if not (students and post_ids and group_ids):
+            raise CommandError("Nothing to benchmark; run with --seed or populate_db first.")
+
+        if options['compare_async'] and not options['asgi']:
+            raise CommandError("--compare-async needs --asgi.")
+        # Message history is members-only, so each client reads its own groups;
+        # clients are picked among students who belong to one.
+        member_groups = {}
+        for email, group_id in Membership.objects.filter(user__email__in=students).values_list('user__email', 'studygroup_id'):
+            member_groups.setdefault(email, []).append(group_id)
+        clients = sorted(students, key=lambda email: email not in member_groups)[:options['clients']]
+        client_groups = [member_groups.get(email, group_ids) for email in clients]
+        target = _Target(options['base_url'])
+        tokens = [self._login(target, email) for email in clients]
+        if options['asgi']:
+            target = _AsgiTarget()
+        requests = {
+            'post-list': lambda client: ('GET', reverse('post-list'), None),
+            'post-detail': lambda client: ('GET', reverse('post-detail', args=[rng.choice(post_ids)]), None),
+            'post-timeline': lambda client: ('GET', reverse('post-timeline'), None),
+            'comment-list': lambda client: ('GET', f"{reverse('comment-list')}?post={rng.choice(post_ids)}", None),
+            'group-messages': lambda client: ('GET', reverse('group-messages', args=[rng.choice(client_groups[client])]), None),
+            'user-profile': lambda client: ('GET', reverse('profile'), None),
+            'join-group': lambda client: ('POST', reverse('join-group', args=[rng.choice(group_ids)]), None),
+            'login': lambda client: ('POST', reverse('token_obtain_pair'), {'email': rng.choice(students), 'password': SEED_PASSWORD}),
+        }
+
+        results = {}
+        # AsyncClient always sends Host: testserver.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']) if options['asgi'] else nullcontext():
+            for name in options['endpoints']:
+                if not options['compare_async']:
+                    results[name] = self._run(target, requests[name], tokens, options)
+                    self._report(name, results[name])
+                    continue
+                for mode, enabled in (('sync', False), ('async', True)):
+                    with override_settings(ASYNC_READ_VIEWS=enabled):
+                        results[f'{name}:{mode}'] = self._run(target, requests[name], tokens, options)
+                    self._report(f'{name}:{mode}', results[f'{name}:{mode}'])
+                sync_rps, async_rps = results[f'{name}:sync']['throughput_rps'], results[f'{name}:async']['throughput_rps']
+                if sync_rps and async_rps:
+                    self.stdout.write(f"{name:<16} async/sync throughput {async_rps / sync_rps:.2f}x")
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'commit': self._commit(),
+                'database': connection.vendor,
+                'target': options['base_url'] or ('in-process-asgi' if options['asgi'] else 'in-process'),
+                'clients': options['clients'],
+                'requests_per_endpoint': options['requests'],
+                'dataset': {
+                    'users': User.objects.count(),
+                    'posts': Post.objects.count(),
+                    'comments': Comment.objects.count(),
+                    'likes': Post.likes.through.objects.count(),
+                    'groups': StudyGroup.objects.count(),
+                    'messages': Message.objects.count(),
+                },
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['max_regression'])
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def _login(self, target, email):
+        status, _, content = target.request('POST', reverse('token_obtain_pair'), {'email': email, 'password': SEED_PASSWORD})
+        if status != 200:
+            raise CommandError(f"Could not log in as {email} (HTTP {status}).")
+        return json.loads(content)['access']
+
+    def _run(self, target, build, tokens, options):
+        def send(index):
+            client = index % len(tokens)
+            method, path, data = build(client)
+            started = time.perf_counter()
+            status, timing, _ = target.request(method, path, data, tokens[client])
+            elapsed = time.perf_counter() - started
+            match = QUERIES.search(timing)
+            return status, elapsed, int(match.group(1)) if match else None
+
+        if isinstance(target, _AsgiTarget):
+            # Not async_to_sync: its calling thread would run every request's sync work.
+            samples, wall = asyncio.run(self._gather(target, build, tokens, options))
+        else:
+            with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+                list(pool.map(send, range(options['warmup'])))
+                started = time.perf_counter()
+                samples = list(pool.map(send, range(options['requests'])))
+                wall = time.perf_counter() - started
+
+        latencies = [elapsed * 1000 for _, elapsed, _ in samples]
+        queries = [count for _, _, count in samples if count is not None]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for status, _, _ in samples if status >= 400),
+            'throughput_rps': round(len(samples) / wall, 1) if wall else None,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50), 2),
+                'p95': round(_percentile(latencies, 95), 2),
+                'p99': round(_percentile(latencies, 99), 2),
+                'max': round(max(latencies), 2),
+                'mean': round(statistics.fmean(latencies), 2),
+            },
+            'queries_per_request': {
+                'mean': round(statistics.fmean(queries), 2) if queries else None,
+                'max': max(queries) if queries else None,
+            },
+        }
+
+    async def _gather(self, target, build, tokens, options):
+        slots = asyncio.Semaphore(options['clients'])
+
+        async def send(index):
+            async with slots:
+                client = index % len(tokens)
+                method, path, data = build(client)
+                started = time.perf_counter()
+                status, timing, _ = await target.request(method, path, data, tokens[client])
+                elapsed = time.perf_counter() - started
+            match = QUERIES.search(timing)
+            return status, elapsed, int(match.group(1)) if match else None
+
+        await asyncio.gather(*(send(index) for index in range(options['warmup'])))
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(send(index) for index in range(options['requests'])))
+        return samples, time.perf_counter() - started
+
+    def _report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{name:<16} {result['throughput_rps']:>8} req/s  p50 {latency['p50']:>8} ms  "
+            f"p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms  "
+            f"queries {result['queries_per_request']['mean']}  errors {result['errors']}"
+        )
+
+    def _compare(self, results, path, max_regression):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)['endpoints']
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before, after = baseline[name]['latency_ms']['p95'], result['latency_ms']['p95']
+            change = (after - before) / before if before else 0
+            queries_before = baseline[name]['queries_per_request']['mean']
+            queries_after = result['queries_per_request']['mean']
+            self.stdout.write(f"{name:<16} p95 {before} -> {after} ms ({change:+.0%}), queries {queries_before} -> {queries_after}")
+            if change > max_regression or (queries_before is not None and queries_after is not None and queries_after > queries_before):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Regressions against {path}: {', '.join(regressions)}")
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,26 @@
+import itertools
+
+from django.core.management.base import BaseCommand
+from apps.users.models import StaleSuggestions, User
+from apps.users.suggestions import refresh
+
+class Command(BaseCommand):
+    help = "Recompute people-you-may-know and suggested-group tables for users whose graph changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every user, not only the stale ones")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        else:
+            user_ids = StaleSuggestions.objects.order_by('user_id').values_list('user_id', flat=True)
+        user_ids = iter(list(user_ids))
+
+        total = 0
+        while batch := list(itertools.islice(user_ids, options['batch_size'])):
+            refresh(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Suggestions computed for {total} users."))
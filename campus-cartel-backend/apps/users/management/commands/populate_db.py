@@ -1,57 +1,220 @@
-# filepath: c:\Users\binig\Desktop\Campus-Cartel\campus-cartel-backend\apps\users\management\commands\populate_db.py
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
 
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
 from apps.users.models import User
-from apps.posts.models import Post
-from apps.groups.models import StudyGroup
+from apps.posts.models import Post, Comment
+from apps.groups.models import StudyGroup, Message
+
+# Every seeded account logs in with this password.
+SEED_PASSWORD = 'campus-cartel'
+
+MAJORS = ['Computer Science', 'Cybersecurity', 'Medicine', 'Law', 'Economics', 'Civil Engineering', 'Biology', 'Architecture']
+UNIVERSITIES = ['Addis Ababa University', 'Bahir Dar University', 'Jimma University', 'Hawassa University', 'Mekelle University']
+YEARS = ['freshman', 'sophomore', 'junior', 'senior', 'graduate']
+WORDS = (
+    'exam lecture notes lab project deadline library campus club research thesis assignment midterm '
+    'seminar internship scholarship tutorial hackathon semester professor group study coffee'
+).split()
+
+
+@contextmanager
+def explicit_timestamps(model, field_name):
+    """Let ``bulk_create`` keep generated values of an ``auto_now_add`` field."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def spread(rng, start, end):
+    """A random moment between ``start`` and ``end``."""
+    return start + (end - start) * rng.random()
+
 
 class Command(BaseCommand):
-    help = "Populate the database with mock data"
-
-    def handle(self, *args, **kwargs):
-        # Create 5 users
-        users = []
-        for i, username in enumerate(['alice', 'bob', 'charlie', 'dave', 'eve'], start=1):
-            user = User.objects.create(
-                username=username,
-                email=f"{username}@example.com",
-                avatar=f"https://example.com/avatar{i}.png",
-                bio=f"{username.capitalize()} is a cybersecurity enthusiast.",
-                university="Cyber University",
-                major="Cybersecurity",
-                year="Junior"
+    help = "Populate the database with a synthetic campus; rows are generated and inserted in streamed batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--posts-per-user', type=float, default=2, help="Mean; actual counts are skewed")
+        parser.add_argument('--likes-per-post', type=float, default=4, help="Mean; actual counts are skewed")
+        parser.add_argument('--comments-per-post', type=float, default=1, help="Mean; actual counts are skewed")
+        parser.add_argument('--follows-per-user', type=float, default=3, help="Mean; actual counts are skewed")
+        parser.add_argument('--groups', type=int, default=1)
+        parser.add_argument('--members-per-group', type=float, default=20, help="Mean; actual counts are skewed")
+        parser.add_argument('--messages-per-group', type=float, default=20, help="Mean; actual counts are skewed")
+        parser.add_argument('--organization-share', type=float, default=0.02)
+        parser.add_argument('--seed', type=int, default=42, help="Same seed, same dataset")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--timelines', action='store_true', help="Backfill home timelines afterwards")
+        parser.add_argument('--search-index', action='store_true', help="Rebuild the search index afterwards")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.options = options
+        self.now = timezone.now()
+
+        user_ids = self.stage('users', User, self.generate_users())
+        self.joined = dict(zip(user_ids, self.join_times))
+        # Zipf-like popularity: a few accounts attract most follows and likes.
+        self.popularity = list(itertools.accumulate(1 / rank for rank in range(1, len(user_ids) + 1)))
+        self.user_ids = user_ids
+        self.popular_ids = self.rng.sample(user_ids, len(user_ids))
+
+        follows = User.followers.through
+        self.stage('follows', follows, self.generate_follows(follows))
+        # Timestamps are spread over the past rather than all set to the
+        # moment of insertion, so keyset pages, timelines and range scans see
+        # realistic data.
+        with explicit_timestamps(Post, 'created_at'):
+            post_ids = self.stage('posts', Post, self.generate_posts())
+        likes = Post.likes.through
+        self.stage('likes', likes, self.generate_likes(likes, post_ids))
+        with explicit_timestamps(Comment, 'created_at'):
+            self.stage('comments', Comment, self.generate_comments(post_ids))
+        group_ids = self.stage('groups', StudyGroup, self.generate_groups())
+        members = StudyGroup.members.through
+        self.stage('memberships', members, self.generate_memberships(members, group_ids))
+        with explicit_timestamps(Message, 'timestamp'):
+            self.stage('messages', Message, self.generate_messages(group_ids))
+
+        call_command('reconcile_counters', batch_size=self.batch_size, stdout=self.stdout)
+        if options['timelines']:
+            call_command('backfill_timelines', stdout=self.stdout)
+        if options['search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS("Database populated successfully!"))
+
+    def stage(self, label, model, rows):
+        """Insert ``rows`` in batches and return the range of ids they were given."""
+        started = time.monotonic()
+        total = 0
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            # Through-table rows may repeat a pair; those are skipped.
+            model.objects.bulk_create(batch, ignore_conflicts=bool(model._meta.auto_created))
+            total += len(batch)
+        last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"{label}: {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+        # Batches come from a single writer, so the new rows hold the highest
+        # ids as one block (MySQL's bulk_create doesn't report them).
+        return range(last_id - total + 1, last_id + 1)
+
+    def skewed(self, mean):
+        """Heavy-tailed count with the given mean (most small, a few very large)."""
+        if mean <= 0:
+            return 0
+        return int(self.rng.paretovariate(2.0) * mean / 2)
+
+    def popular_users(self, count):
+        count = min(count, len(self.user_ids))
+        picks = self.rng.choices(self.popular_ids, cum_weights=self.popularity, k=count)
+        return dict.fromkeys(picks)
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def generate_users(self):
+        password = make_password(SEED_PASSWORD)
+        start = User.objects.aggregate(last=Max('id'))['last'] or 0
+        # Join dates in insertion order, i.e. in the order of the new user ids.
+        self.join_times = []
+        for i in range(start, start + self.options['users']):
+            organization = self.rng.random() < self.options['organization_share']
+            date_joined = self.now - timedelta(seconds=self.rng.randrange(365 * 24 * 3600))
+            self.join_times.append(date_joined)
+            yield User(
+                username=f'user{i}',
+                email=f'user{i}@example.edu.et',
+                password=password,
+                bio=self.sentence(8),
+                university=self.rng.choice(UNIVERSITIES),
+                major=self.rng.choice(MAJORS),
+                year=self.rng.choice(YEARS),
+                user_type='organization' if organization else 'student',
+                date_joined=date_joined,
             )
-            users.append(user)
-
-        # Create a common group
-        group = StudyGroup.objects.create(
-            name="Cyber Security",
-            subject="Cybersecurity",
-            description="A group for cybersecurity enthusiasts.",
-            max_members=50,
-            meeting_time="Wednesdays at 6 PM",
-            location="Room 202",
-            image="https://example.com/group1.png"
-        )
-
-        # Add all users to the group
-        group.members.set(users)
-
-        # Create 2 posts for each user
-        posts = []
-        for user in users:
-            for j in range(1, 3):
-                post = Post.objects.create(
-                    author=user,
-                    content=f"{user.username.capitalize()}'s post {j} about cybersecurity.",
-                    image=f"https://example.com/post{j}.png"
+
+    def generate_follows(self, follows):
+        for follower_id in self.user_ids:
+            for followed_id in self.popular_users(self.skewed(self.options['follows_per_user'])):
+                if followed_id != follower_id:
+                    yield follows(from_user_id=followed_id, to_user_id=follower_id)
+
+    def generate_posts(self):
+        self.post_times = []
+        for author_id in self.user_ids:
+            for _ in range(self.skewed(self.options['posts_per_user'])):
+                created_at = spread(self.rng, self.joined[author_id], self.now)
+                self.post_times.append(created_at)
+                yield Post(author_id=author_id, content=self.sentence(self.rng.randint(5, 40)), created_at=created_at)
+
+    def generate_likes(self, likes, post_ids):
+        for post_id in post_ids:
+            for user_id in self.popular_users(self.skewed(self.options['likes_per_post'])):
+                yield likes(post_id=post_id, user_id=user_id)
+
+    def generate_comments(self, post_ids):
+        for post_id, posted_at in zip(post_ids, self.post_times):
+            # Discussions mostly happen within a few days of the post.
+            until = min(posted_at + timedelta(days=3), self.now)
+            for _ in range(self.skewed(self.options['comments_per_post'])):
+                yield Comment(
+                    post_id=post_id, author_id=self.rng.choice(self.user_ids), content=self.sentence(6),
+                    created_at=spread(self.rng, posted_at, until),
                 )
-                posts.append(post)
 
-        # Add likes for each other's posts
-        for post in posts:
-            for user in users:
-                if post.author != user:  # Users cannot like their own posts
-                    post.likes.add(user)
+    def generate_groups(self):
+        # Capacities and creation times in insertion order, i.e. in the order
+        # of the new group ids.
+        self.group_capacities = []
+        self.group_times = []
+        for i in range(self.options['groups']):
+            subject = self.rng.choice(MAJORS)
+            max_members = self.rng.choice([10, 25, 50, 100, 500])
+            created_at = self.now - timedelta(seconds=self.rng.randrange(180 * 24 * 3600))
+            self.group_capacities.append(max_members)
+            self.group_times.append(created_at)
+            yield StudyGroup(
+                name=f"{subject} study group {i}",
+                subject=subject,
+                description=self.sentence(12),
+                max_members=max_members,
+                created_at=created_at,
+            )
+
+    def generate_memberships(self, members, group_ids):
+        # Groups are never over capacity; reconcile_counters then sets
+        # member_count from these rows.
+        for group_id, max_members in zip(group_ids, self.group_capacities):
+            count = min(max(1, self.skewed(self.options['members_per_group'])), max_members)
+            for user_id in self.popular_users(count):
+                yield members(studygroup_id=group_id, user_id=user_id)
 
-        self.stdout.write(self.style.SUCCESS("Database populated successfully!"))
\ No newline at end of file
+    def generate_messages(self, group_ids):
+        members = StudyGroup.members.through.objects
+        for group_id, created_at in zip(group_ids, self.group_times):
+            count = self.skewed(self.options['messages_per_group'])
+            if not count:
+                continue
+            senders = list(members.filter(studygroup_id=group_id).values_list('user_id', flat=True))
+            # Sorted: a group's message ids grow with their timestamps.
+            for timestamp in sorted(spread(self.rng, created_at, self.now) for _ in range(count)):
+                yield Message(
+                    group_id=group_id, sender_id=self.rng.choice(senders), content=self.sentence(self.rng.randint(2, 15)),
+                    timestamp=timestamp,
+                )
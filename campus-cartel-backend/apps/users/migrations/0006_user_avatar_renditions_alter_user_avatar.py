@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:06
+
+import campus_cartel.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_user_joined_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/', validators=[campus_cartel.images.ImageUploadValidator()]),
+        ),
+    ]
@@ -0,0 +1,75 @@
+import apps.users.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+
+    def counted(field):
+        follows = Follow.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        return Coalesce(Subquery(follows.annotate(total=Count('*')).values('total')), 0)
+
+    User.objects.update(followers_count=counted('from_user'), following_count=counted('to_user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_suggestions'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.users.models.AccountManager()),
+            ],
+        ),
+        # The M2M table already exists; only the migration state learns about
+        # the explicit through model.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('from_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('to_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'users_user_followers',
+                        'unique_together': {('from_user', 'to_user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='followers',
+                    field=models.ManyToManyField(blank=True, related_name='following', through='users.Follow', through_fields=('from_user', 'to_user'), to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['from_user', 'id', 'to_user'], name='follow_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_user', 'id', 'from_user'], name='follow_following_idx'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,81 @@
-from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.db import models
+from django.contrib.auth.models import AbstractUser, Group, Permission, UserManager
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+from campus_cartel.db import insert_ignore
+from campus_cartel.images import ImageUploadValidator
+
+
+class _AlreadyFollowing(Exception):
+    pass
+
+
+class UserQuerySet(models.QuerySet):
+    def follow(self, follower_id, followed_id):
+        """
+        Make ``follower_id`` follow ``followed_id``; returns ``(followed, followers_count)``.
+
+        One INSERT for the edge and one UPDATE moving both accounts' counters,
+        so the two rows are locked in index order and crossed follows can't
+        deadlock. Raises ``User.DoesNotExist`` when either account is missing.
+        """
+        try:
+            with transaction.atomic():
+                if self._move_counters(follower_id, followed_id, 1) < 2:
+                    raise self.model.DoesNotExist
+                if not insert_ignore(Follow, from_user_id=followed_id, to_user_id=follower_id):
+                    # Already following: undo the increments.
+                    raise _AlreadyFollowing
+                self._follows_changed('post_add', follower_id, followed_id)
+            followed = True
+        except _AlreadyFollowing:
+            followed = False
+        return followed, self.filter(pk=followed_id).values_list('followers_count', flat=True).get()
+
+    def unfollow(self, follower_id, followed_id):
+        """Mirror of ``follow``; returns ``(unfollowed, followers_count)``."""
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(from_user_id=followed_id, to_user_id=follower_id).delete()
+            if deleted:
+                self._move_counters(follower_id, followed_id, -1)
+                self._follows_changed('post_remove', follower_id, followed_id)
+        return bool(deleted), self.filter(pk=followed_id).values_list('followers_count', flat=True).get()
+
+    def _move_counters(self, follower_id, followed_id, delta):
+        def step(pk, counter):
+            condition = Q(pk=pk) if delta > 0 else Q(pk=pk, **{f'{counter}__gt': 0})
+            return F(counter) + Case(When(condition, then=delta), default=0)
+
+        return self.filter(pk__in=[follower_id, followed_id]).update(
+            followers_count=step(followed_id, 'followers_count'),
+            following_count=step(follower_id, 'following_count'),
+        )
+
+    def _follows_changed(self, action, follower_id, followed_id):
+        m2m_changed.send(
+            sender=Follow, instance=self.model(pk=followed_id), action=action,
+            reverse=False, model=self.model, pk_set={follower_id}, using=self.db,
+        )
+
+    def reconcile_counters(self):
+        """Rewrite ``followers_count``/``following_count`` where they drifted from the follow rows."""
+        def counted(field):
+            follows = Follow.objects.filter(**{field: models.OuterRef('pk')}).order_by().values(field)
+            return Coalesce(models.Subquery(follows.annotate(total=models.Count('*')).values('total')), 0)
+
+        actual = {'followers_count': counted('from_user'), 'following_count': counted('to_user')}
+        drifted = self.annotate(actual_followers=actual['followers_count'], actual_following=actual['following_count'])
+        drifted_ids = list(drifted.filter(
+            ~Q(followers_count=F('actual_followers')) | ~Q(following_count=F('actual_following'))
+        ).values_list('pk', flat=True))
+        if not drifted_ids:
+            return 0
+        return self.model.objects.filter(pk__in=drifted_ids).update(**actual)
+
+
+class AccountManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -17,7 +93,8 @@ class User(AbstractUser):
 
     firstname = models.CharField(max_length=50, blank=True, null=True)
     lastname = models.CharField(max_length=50, blank=True, null=True)
-    avatar = models.ImageField(blank=True, null=True, upload_to='avatars/')
+    avatar = models.ImageField(blank=True, null=True, upload_to='avatars/', validators=[ImageUploadValidator()])
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
     email = models.EmailField(unique=True)
     bio = models.TextField(blank=True, null=True)
     university = models.CharField(max_length=255, blank=False, null=True)
@@ -25,8 +102,12 @@ class User(AbstractUser):
     year = models.CharField(max_length=50 ,choices=YEAR_CHOICES, default='other',blank=False, null=True)
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='student')
     followers = models.ManyToManyField(
-        'self', symmetrical=False, related_name='following', blank=True
+        'self', symmetrical=False, related_name='following', blank=True,
+        through='Follow', through_fields=('from_user', 'to_user'),
     )
+    # Maintained by follow()/unfollow(); reconcile_counters fixes drift from other writes.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     groups = models.ManyToManyField(
         Group,
@@ -45,10 +126,40 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ['username', 'user_type']
     USERNAME_FIELD = 'email'
 
+    objects = AccountManager()
+
 
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # A user built from token claims holds the claims as of the token and
+        # other fields from the auth cache; writing those back could undo a
+        # later change, such as revoked staff rights. Load the row to save it.
+        if getattr(self, 'from_claims', False):
+            from .authentication import CLAIMS
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None or not {'is_active', *CLAIMS}.isdisjoint(update_fields):
+                raise ValueError("A user authenticated from token claims can't be saved; load it from the database.")
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users authenticated from token claims fill their deferred fields
+        # from the auth cache rather than the database.
+        if getattr(self, 'from_claims', False) and fields and from_queryset is None:
+            from .authentication import cached_user_values
+            deferred = self.get_deferred_fields()
+            for attname, value in (cached_user_values(self.pk) or {}).items():
+                if attname in deferred:
+                    setattr(self, attname, value)
+            fields = [field for field in fields if field in self.get_deferred_fields()]
+            if not fields:
+                return
+        super().refresh_from_db(using, fields, from_queryset)
 
     def __str__(self):
         return self.username
@@ -65,4 +176,43 @@ class User(AbstractUser):
     def get_user_type(self):
         return self.user_type
     
-    
\ No newline at end of file
+    
+
+
+class Follow(models.Model):
+    # Keeps the table and column names of the former auto-created M2M:
+    # ``from_user`` is the followed account, ``to_user`` the follower.
+    from_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    to_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        db_table = 'users_user_followers'
+        unique_together = [('from_user', 'to_user')]
+        indexes = [
+            # Cover the follower and following listings, newest first.
+            models.Index(fields=['from_user', 'id', 'to_user'], name='follow_followers_idx'),
+            models.Index(fields=['to_user', 'id', 'from_user'], name='follow_following_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_user_id} follows {self.from_user_id}"
+
+
+class UserSuggestion(models.Model):
+    """A precomputed "people you may know" entry; see ``compute_suggestions``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    mutual_follows = models.PositiveIntegerField(default=0)
+    shared_groups = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('user', 'suggested')]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='usersuggestion_rank_idx'),
+        ]
+
+
+class StaleSuggestions(models.Model):
+    """Users whose follows or memberships changed since their suggestions were computed."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='+')
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import User
+from .models import User, UserSuggestion
 from django.contrib.auth import get_user_model  # Use get_user_model to reference the custom User model
 
 User = get_user_model()
@@ -7,16 +7,26 @@ User = get_user_model()
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from campus_cartel.images import RenditionsField
+from campus_cartel.metrics import InstrumentedSerializerMixin
+from campus_cartel.sparse import SparseFieldsMixin
+from .authentication import CLAIMS, ClaimsRefreshToken, get_cached_user
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, InstrumentedSerializerMixin, serializers.ModelSerializer):
+    avatar_renditions = RenditionsField()
+
     class Meta:
         model = User
         fields = [
-            'id', 'username', 'email', 'firstname', 'lastname', 'avatar', 'bio',
-            'university', 'major', 'year', 'user_type'
+            'id', 'username', 'email', 'firstname', 'lastname', 'avatar', 'avatar_renditions', 'bio',
+            'university', 'major', 'year', 'user_type', 'followers_count', 'following_count'
         ]
+        read_only_fields = ['followers_count', 'following_count']
         extra_kwargs = {
             'firstname': {'required': False, 'allow_null': True, 'allow_blank': True},
             'lastname': {'required': False, 'allow_null': True, 'allow_blank': True},
@@ -58,10 +68,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         return attrs
     
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'firstname', 'lastname', 'avatar', 'bio', 'university', 'major', 'year']
+        fields = ['id', 'username', 'email', 'firstname', 'lastname', 'avatar', 'bio', 'university', 'major', 'year', 'followers_count', 'following_count']
+        read_only_fields = ['followers_count', 'following_count']
 
     def update(self, instance, validated_data):
         instance.firstname = validated_data.get('firstname', instance.firstname)
@@ -107,7 +118,7 @@ class UserChangePasswordSerializer(serializers.Serializer):
 
         return attrs
     def save(self):
-        user = self.context['request'].user
+        user = User.objects.get(pk=self.context['request'].user.pk)
         new_password = self.validated_data['new_password']
         user.set_password(new_password)
         user.save()
@@ -157,4 +168,48 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
             'major': {'required': False},
             'year': {'required': False},
         }
-        read_only_fields = ['id', 'email', 'user_type']
\ No newline at end of file
+        read_only_fields = ['id', 'email', 'user_type']
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    # Fields are what FollowListView loads; keep the two in step.
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'firstname', 'lastname', 'avatar', 'user_type']
+        read_only_fields = fields
+
+class UserSuggestionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='suggested.id', read_only=True)
+    username = serializers.CharField(source='suggested.username', read_only=True)
+    firstname = serializers.CharField(source='suggested.firstname', read_only=True)
+    lastname = serializers.CharField(source='suggested.lastname', read_only=True)
+    avatar = serializers.ImageField(source='suggested.avatar', read_only=True)
+    university = serializers.CharField(source='suggested.university', read_only=True)
+    major = serializers.CharField(source='suggested.major', read_only=True)
+
+    class Meta:
+        model = UserSuggestion
+        fields = ['id', 'username', 'firstname', 'lastname', 'avatar', 'university', 'major', 'score', 'mutual_follows', 'shared_groups']
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = get_cached_user(refresh.payload.get(api_settings.USER_ID_CLAIM))
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        # Re-issue the claims so access tokens pick up changes to them.
+        access = refresh.access_token
+        for claim in CLAIMS:
+            access[claim] = getattr(user, claim)
+        data = {'access': str(access)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
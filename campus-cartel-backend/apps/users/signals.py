@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from campus_cartel import images
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from campus_cartel.cache import invalidate_namespace, invalidate_object
+from .authentication import blacklist_cache, invalidate_cached_user
+from .models import Follow, User, UserSuggestion
+from .suggestions import mark_stale
+
+images.register(User, 'avatar', 'avatar_renditions')
+
+# Saves that don't change anything the API shows.
+UNCACHED_FIELDS = {'last_login', 'password'}
+
+
+def invalidate_embedding_namespaces():
+    # Posts embed their author (lists, and details with ?expand=author) and
+    # groups their member preview.
+    invalidate_namespace('post')
+    invalidate_namespace('group')
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    invalidate_cached_user(instance.pk)
+    if update_fields and set(update_fields) <= UNCACHED_FIELDS:
+        return
+    invalidate_object('user', instance.pk)
+    invalidate_embedding_namespaces()
+
+
+@receiver(images.renditions_ready, sender=User)
+def invalidate_user_renditions(sender, pk, **kwargs):
+    invalidate_object('user', pk)
+    invalidate_embedding_namespaces()
+
+
+@receiver([post_save, post_delete], sender=BlacklistedToken)
+def invalidate_blacklist(sender, **kwargs):
+    blacklist_cache.invalidate()
+
+
+@receiver(m2m_changed, sender=Follow)
+def follows_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    # Forward: instance gained/lost followers; reverse: instance (un)followed accounts.
+    pairs = [(instance.pk, pk) for pk in pk_set] if reverse else [(pk, instance.pk) for pk in pk_set]
+    # Both accounts' counters changed.
+    for pk in {pk for pair in pairs for pk in pair}:
+        invalidate_cached_user(pk)
+        invalidate_object('user', pk)
+
+    def refresh():
+        mark_stale({follower for follower, _ in pairs})
+        if action == 'post_add':
+            # A followed account is no longer a suggestion.
+            for follower, followed in pairs:
+                UserSuggestion.objects.filter(user_id=follower, suggested_id=followed).delete()
+
+    # Kept out of the follow's transaction and skipped if it rolls back.
+    transaction.on_commit(refresh)
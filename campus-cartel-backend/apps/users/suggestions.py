@@ -0,0 +1,79 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from apps.groups.models import GroupSuggestion, Membership
+from apps.groups.suggestions import suggested_groups
+from .models import StaleSuggestions, User, UserSuggestion
+
+SUGGESTIONS_PER_USER = 20
+
+MUTUAL_FOLLOW_WEIGHT = 1.0
+SHARED_GROUP_WEIGHT = 0.5
+# Only added to candidates already reached through the graph.
+PROFILE_WEIGHTS = {'university': 0.5, 'major': 0.5, 'year': 0.25}
+
+
+def mark_stale(user_ids):
+    StaleSuggestions.objects.bulk_create([StaleSuggestions(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+
+
+def _pairs(queryset, user_field, candidate_field):
+    # One GROUP BY over a self-join of an edge table: the rows of the sparse
+    # matrix product restricted to the batch's users.
+    return queryset.order_by().values_list(user_field, candidate_field).annotate(n=Count('*'))
+
+
+def people_you_may_know(user_ids):
+    """``{user_id: [UserSuggestion, ...]}`` for a batch of users, best first."""
+    follows = User.followers.through.objects
+    # (u, v): accounts u follows that follow v, then groups u and v share.
+    mutual = _pairs(follows.filter(to_user__followers__in=user_ids), 'to_user__followers', 'from_user')
+    shared = _pairs(Membership.objects.filter(studygroup__memberships__user__in=user_ids), 'studygroup__memberships__user', 'user')
+
+    counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for user_id, candidate_id, n in mutual:
+        counts[user_id][candidate_id][0] = n
+    for user_id, candidate_id, n in shared:
+        counts[user_id][candidate_id][1] = n
+
+    following = defaultdict(set)
+    for user_id, followed_id in follows.filter(to_user__in=user_ids).values_list('to_user_id', 'from_user_id'):
+        following[user_id].add(followed_id)
+    candidate_ids = {candidate_id for candidates in counts.values() for candidate_id in candidates}
+    profiles = {
+        row[0]: row[1:]
+        for row in User.objects.filter(id__in=candidate_ids | set(user_ids)).values_list('id', *PROFILE_WEIGHTS)
+    }
+
+    suggestions = {}
+    for user_id in user_ids:
+        profile = profiles.get(user_id, ())
+        ranked = []
+        for candidate_id, (mutual_follows, shared_groups) in counts[user_id].items():
+            if candidate_id == user_id or candidate_id in following[user_id]:
+                continue
+            score = mutual_follows * MUTUAL_FOLLOW_WEIGHT + shared_groups * SHARED_GROUP_WEIGHT
+            for mine, theirs, weight in zip(profile, profiles[candidate_id], PROFILE_WEIGHTS.values()):
+                if mine and mine == theirs:
+                    score += weight
+            ranked.append(UserSuggestion(
+                user_id=user_id, suggested_id=candidate_id, score=score,
+                mutual_follows=mutual_follows, shared_groups=shared_groups,
+            ))
+        suggestions[user_id] = heapq.nlargest(SUGGESTIONS_PER_USER, ranked, key=lambda s: (s.score, -s.suggested_id))
+    return suggestions
+
+
+def refresh(user_ids):
+    """Recompute people and group suggestions for ``user_ids`` and replace the stored ones."""
+    with transaction.atomic():
+        # Cleared first, so users marked while this batch runs stay marked.
+        StaleSuggestions.objects.filter(user_id__in=user_ids).delete()
+        people = people_you_may_know(user_ids)
+        groups = suggested_groups(user_ids)
+        UserSuggestion.objects.filter(user_id__in=user_ids).delete()
+        UserSuggestion.objects.bulk_create([s for batch in people.values() for s in batch])
+        GroupSuggestion.objects.filter(user_id__in=user_ids).delete()
+        GroupSuggestion.objects.bulk_create([s for batch in groups.values() for s in batch])
@@ -1,8 +1,21 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
-from apps.users.models import User
+from apps.users.models import StaleSuggestions, User, UserSuggestion
+from apps.groups.models import Message, StudyGroup
+from apps.posts.models import Comment, Post
+from apps.users.authentication import ClaimsJWTAuthentication, ClaimsRefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
 class AuthenticationTests(TestCase):
     def setUp(self):
@@ -13,19 +26,302 @@ class AuthenticationTests(TestCase):
             email='testuser@example.com'
         )
         self.login_url = reverse('token_obtain_pair')
+        cache.clear()
 
     def test_login_successful(self):
         response = self.client.post(self.login_url, {
-            'username': 'testuser',
+            'email': 'testuser@example.com',
             'password': 'testpassword'
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('access', response.data)
-        self.assertIn('refresh', response.data)
+        self.assertIn('access', response.json())
+        self.assertIn('refresh', response.json())
 
     def test_login_unsuccessful(self):
         response = self.client.post(self.login_url, {
-            'username': 'testuser',
+            'email': 'testuser@example.com',
             'password': 'wrongpassword'
         })
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_email_looks_like_a_wrong_password(self):
+        response = self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), {'detail': 'Invalid credentials'})
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (30, 60), 'account': (3, 300)})
+    def test_failed_logins_throttle_the_account(self):
+        for _ in range(3):
+            self.client.post(self.login_url, {'email': 'testuser@example.com', 'password': 'wrong'})
+        response = self.client.post(self.login_url, {'email': 'TestUser@example.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (2, 60), 'account': (5, 300)})
+    def test_logins_are_throttled_per_ip(self):
+        for _ in range(2):
+            response = self.client.post(self.login_url, {'email': 'testuser@example.com', 'password': 'testpassword'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.login_url, {'email': 'testuser@example.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = APIClient(REMOTE_ADDR='10.0.0.2')
+        response = other.post(self.login_url, {'email': 'testuser@example.com', 'password': 'testpassword'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    def test_seed_run_and_save_results(self):
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        call_command(
+            'benchmark_api', seed=True, users=6, posts_per_user=2, groups=2, messages_per_group=5,
+            endpoints=['post-list', 'group-messages'], clients=2, requests=6, warmup=0,
+            output=output, stdout=StringIO(),
+        )
+        with open(output) as results_file:
+            results = json.load(results_file)
+
+        self.assertEqual(results['meta']['dataset']['users'], 6)
+        self.assertEqual(results['meta']['dataset']['posts'], Post.objects.count())
+        post_list = results['endpoints']['post-list']
+        self.assertEqual(post_list['requests'], 6)
+        self.assertEqual(post_list['errors'], 0)
+        self.assertGreater(post_list['queries_per_request']['mean'], 0)
+        self.assertLessEqual(post_list['latency_ms']['p50'], post_list['latency_ms']['p99'])
+
+    def test_compare_sync_and_async_views_over_asgi(self):
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        call_command(
+            'benchmark_api', seed=True, users=6, posts_per_user=2, groups=2, messages_per_group=5,
+            endpoints=['post-detail', 'group-messages', 'user-profile'], clients=3, requests=6, warmup=0,
+            asgi=True, compare_async=True, output=output, stdout=StringIO(),
+        )
+        with open(output) as results_file:
+            results = json.load(results_file)
+
+        self.assertEqual(results['meta']['target'], 'in-process-asgi')
+        for name in ['post-detail', 'group-messages', 'user-profile']:
+            for mode in ['sync', 'async']:
+                self.assertEqual(results['endpoints'][f'{name}:{mode}']['errors'], 0)
+
+    @override_settings(LOGIN_THROTTLE_RATES={'ip': (2, 60), 'account': (5, 300)})
+    def test_login_is_not_held_to_the_per_ip_limit_in_process(self):
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        call_command(
+            'benchmark_api', seed=True, users=6, posts_per_user=1, groups=1, messages_per_group=1,
+            endpoints=['login'], clients=2, requests=8, warmup=0, asgi=True, output=output, stdout=StringIO(),
+        )
+        with open(output) as results_file:
+            self.assertEqual(json.load(results_file)['endpoints']['login']['errors'], 0)
+
+
+class PopulateDbTests(TransactionTestCase):
+    def populate(self, seed):
+        call_command('populate_db', users=40, posts_per_user=3, groups=3, seed=seed, batch_size=7, stdout=StringIO())
+        return (
+            list(User.objects.order_by('id').values_list('major', 'user_type')),
+            list(Post.objects.order_by('id').values_list('author__username', 'content')),
+            list(User.followers.through.objects.order_by('id').values_list('from_user__username', 'to_user__username')),
+        )
+
+    def test_same_seed_same_dataset(self):
+        first = self.populate(seed=7)
+        User.objects.all().delete()
+        self.assertEqual(self.populate(seed=7), first)
+        self.assertGreater(len(first[1]), 0)
+
+    def test_counters_match_generated_rows(self):
+        self.populate(seed=1)
+        for post in Post.objects.all():
+            self.assertEqual(post.likes_count, post.likes.count())
+            self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_timestamps_are_spread_out(self):
+        self.populate(seed=2)
+        for model, field in ((Post, 'created_at'), (Comment, 'created_at'), (Message, 'timestamp')):
+            times = list(model.objects.values_list(field, flat=True))
+            self.assertGreater(max(times) - min(times), timedelta(hours=1), model.__name__)
+        for group_id in Message.objects.values_list('group_id', flat=True).distinct():
+            times = list(Message.objects.filter(group_id=group_id).order_by('id').values_list('timestamp', flat=True))
+            self.assertEqual(times, sorted(times))
+
+    def test_groups_stay_within_capacity(self):
+        call_command('populate_db', users=60, groups=20, members_per_group=40, seed=3, stdout=StringIO())
+        for group in StudyGroup.objects.all():
+            self.assertLessEqual(group.member_count, group.max_members)
+            self.assertEqual(group.member_count, group.members.count())
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='claims', email='claims@example.edu.et', password='testpassword', user_type='student', major='Law'
+        )
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_claims_user_needs_no_query(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual((user.pk, user.user_type, user.is_staff), (self.user.pk, 'student', False))
+        self.assertIsInstance(user, User)
+
+    def test_full_user_is_loaded_once_then_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().major, 'Law')
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual((user.major, user.email), ('Law', 'claims@example.edu.et'))
+
+        self.user.major = 'Medicine'
+        self.user.save()
+        self.assertEqual(self.authenticate().major, 'Medicine')
+
+    async def test_async_profile_view(self):
+        client = AsyncClient()
+        response = await client.get(reverse('profile'), headers={'Authorization': f'Bearer {self.refresh.access_token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.json()['email'], response.json()['major']), ('claims@example.edu.et', 'Law'))
+
+        response = await client.get(reverse('profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+    @override_settings(API_CACHE_SHARED=True)
+    def test_blacklisted_refresh_token_is_rejected_without_queries(self):
+        client = APIClient()
+        refresh_url = reverse('token_refresh')
+        self.assertEqual(client.post(refresh_url, {'refresh': str(self.refresh)}).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            ClaimsRefreshToken(str(self.refresh))
+
+        client.force_authenticate(self.user)
+        client.post(reverse('logout'), {'refresh': str(self.refresh)})
+        response = client.post(refresh_url, {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_keeps_revoked_privileges(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        access = ClaimsRefreshToken.for_user(User.objects.get(pk=self.user.pk)).access_token
+        # An admin revokes the rights the token still claims.
+        User.objects.filter(pk=self.user.pk).update(is_staff=False, is_active=False)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.patch(reverse('profile'), {'bio': 'Updated'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual((user.bio, user.is_staff, user.is_active), ('Updated', False, False))
+
+    def test_claims_user_cannot_be_saved(self):
+        user = self.authenticate()
+        with self.assertRaises(ValueError):
+            user.save()
+        with self.assertRaises(ValueError):
+            user.save(update_fields=['is_staff'])
+
+    def test_per_process_cache_checks_the_blacklist_in_the_database(self):
+        ClaimsRefreshToken(str(self.refresh))
+        # Blacklisted by another worker: this process's cache never hears of it.
+        token = OutstandingToken.objects.get(jti=self.refresh['jti'])
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)])
+        with self.assertRaises(TokenError):
+            ClaimsRefreshToken(str(self.refresh))
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        def user(name, **fields):
+            return User.objects.create_user(username=name, email=f'{name}@example.edu.et', password='testpassword', **fields)
+
+        self.alice = user('alice', major='Biology')
+        self.bob, self.carol, self.dave = user('bob'), user('carol'), user('dave')
+        self.bob.followers.add(self.alice)
+        self.carol.followers.add(self.bob)
+        self.shared = StudyGroup.objects.create(name='Shared', subject='Law', description='Test', max_members=10)
+        self.bobs = StudyGroup.objects.create(name="Bob's", subject='Law', description='Test', max_members=10)
+        self.biology = StudyGroup.objects.create(name='Biology', subject='Biology', description='Test', max_members=10)
+        for group, member in [(self.shared, self.alice), (self.shared, self.dave), (self.bobs, self.bob)]:
+            StudyGroup.objects.join(group.id, member.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_suggestions_are_ranked_and_served_in_one_query(self):
+        call_command('compute_suggestions', '--all', stdout=StringIO())
+        with self.assertNumQueries(1):
+            people = self.client.get(reverse('user-suggestions')).data
+        self.assertEqual([(p['username'], p['mutual_follows'], p['shared_groups']) for p in people], [('carol', 1, 0), ('dave', 0, 1)])
+        with self.assertNumQueries(1):
+            groups = self.client.get(reverse('group-suggestions')).data
+        self.assertEqual([(g['name'], g['friends']) for g in groups], [("Bob's", 1), ('Biology', 0)])
+
+    def test_only_stale_users_are_recomputed(self):
+        call_command('compute_suggestions', '--all', stdout=StringIO())
+        self.assertFalse(StaleSuggestions.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carol.followers.add(self.alice)
+        # Following a suggestion removes it right away.
+        self.assertFalse(UserSuggestion.objects.filter(user=self.alice, suggested=self.carol).exists())
+        out = StringIO()
+        call_command('compute_suggestions', stdout=out)
+        self.assertIn('for 1 users', out.getvalue())
+
+
+class FollowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.edu.et', password='testpassword')
+            for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def follow(self, user, followed, action='follow'):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(reverse(action, args=[followed.id]))
+
+    def test_follow_is_idempotent_and_counted(self):
+        target = self.users[1]
+        self.assertEqual((self.follow(self.users[0], target).data['followers']), 1)
+        self.assertEqual((self.follow(self.users[0], target).data['followers']), 1)
+        self.follow(self.users[2], target)
+        target.refresh_from_db()
+        self.assertEqual((target.followers_count, target.followers.count()), (2, 2))
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).following_count, 1)
+
+        self.assertEqual(self.follow(self.users[0], target, 'unfollow').data['followers'], 1)
+        self.assertEqual(self.follow(self.users[0], target, 'unfollow').data['followers'], 1)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).following_count, 0)
+        self.assertEqual(self.client.get(reverse('user-detail', args=[target.id])).data['followers_count'], 1)
+
+    def test_follow_errors(self):
+        self.assertEqual(self.follow(self.users[0], self.users[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(reverse('follow', args=[999])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).following_count, 0)
+
+    def test_follower_and_following_lists_are_cursor_paginated(self):
+        target = self.users[0]
+        for user in self.users[1:]:
+            self.follow(user, target)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-followers', args=[target.id]), {'page_size': 2})
+        self.assertEqual([u['username'] for u in response.data['results']], ['user3', 'user2'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([u['username'] for u in response.data['results']], ['user1'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(reverse('user-following', args=[self.users[1].id]))
+        self.assertEqual([u['username'] for u in response.data['results']], ['user0'])
+        self.assertEqual(self.client.get(reverse('user-following', args=[999])).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reconcile_counters_fixes_direct_m2m_writes(self):
+        self.users[1].followers.add(self.users[0])
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(User.objects.get(pk=self.users[1].pk).followers_count, 1)
+        self.assertEqual(User.objects.get(pk=self.users[0].pk).following_count, 1)
@@ -1,11 +1,20 @@
 from django.urls import path
-from .views import UserListCreateView, UserDetailView , RegisterView, UserProfileView, LogoutView ,UserLoginView
+from .views import (
+    UserListCreateView, UserDetailView , RegisterView, AsyncUserProfileView, LogoutView , UserSuggestionsView, login_view,
+    FollowView, UnfollowView, FollowersView, FollowingView,
+)
+
 
 urlpatterns = [
     path('', UserListCreateView.as_view(), name='user-list'),
     path('<int:id>/', UserDetailView.as_view(), name='user-detail'),  # <-- Change pk to id
+    path('<int:id>/follow/', FollowView.as_view(), name='follow'),
+    path('<int:id>/unfollow/', UnfollowView.as_view(), name='unfollow'),
+    path('<int:id>/followers/', FollowersView.as_view(), name='user-followers'),
+    path('<int:id>/following/', FollowingView.as_view(), name='user-following'),
     path('register/', RegisterView.as_view(), name='register'),
-    path('profile/', UserProfileView.as_view(), name='profile'),
+    path('profile/', AsyncUserProfileView.as_view(), name='profile'),
     path('logout/', LogoutView.as_view(), name='logout'),
-    path('login/', UserLoginView.as_view(), name='login'),
+    path('login/', login_view, name='login'),
+    path('suggestions/', UserSuggestionsView.as_view(), name='user-suggestions'),
 ]
\ No newline at end of file
@@ -1,21 +1,32 @@
 from rest_framework import generics , status
 from django.contrib.auth import get_user_model  # Use get_user_model to reference the custom User model
-from .serializers import UserSerializer , RegisterSerializer , UserProfileSerializer , UserLoginSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+import json
+import math
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from .models import Follow, UserSuggestion
+from .serializers import UserSerializer , RegisterSerializer , UserProfileSerializer, UserSuggestionSerializer, UserSummarySerializer
+from . import login
+from .authentication import ClaimsRefreshToken, aget_cached_user
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated , IsAdminUser
-from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated , IsAdminUser
+from rest_framework.exceptions import NotAuthenticated, NotFound, ValidationError
 from django.contrib.auth.hashers import make_password
-from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from campus_cartel.asyncviews import AsyncReadView
+from campus_cartel.cache import CachedRetrieveMixin
+from campus_cartel.pagination import FollowPagination, UserPagination
+from campus_cartel.sparse import SparseQuerysetMixin
 
 # Get the custom User model
 User = get_user_model()
 
-class UserListCreateView(generics.ListCreateAPIView):
+class UserListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserPagination
 
     def perform_create(self, serializer):
         email = serializer.validated_data.get('email')
@@ -29,9 +40,10 @@ class UserListCreateView(generics.ListCreateAPIView):
         password = serializer.validated_data.get('password')
         serializer.save(password=make_password(password))
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(SparseQuerysetMixin, CachedRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    cache_namespace = 'user'
     lookup_field = 'id'
     permission_classes = [AllowAny]
 
@@ -52,48 +64,143 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        # Updates start from the row, not from the token's claims.
+        return get_object_or_404(User, pk=self.request.user.pk)
+
+class AsyncUserProfileView(AsyncReadView):
+    view_class = UserProfileView
+
+    async def read(self, view, request):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        # The claims user defers its other fields; load them all up front.
+        user = await aget_cached_user(request.user.id)
+        if user is None:
+            raise NotFound()
+        return view.get_serializer(user).data
+
+class FollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id):
+        if id == request.user.id:
+            raise ValidationError("You can't follow yourself.")
+        try:
+            followed, followers_count = User.objects.follow(request.user.id, id)
+        except User.DoesNotExist:
+            raise NotFound()
+        detail = 'Followed successfully.' if followed else 'You already follow this user.'
+        return Response({'detail': detail, 'following': True, 'followers': followers_count})
+
+class UnfollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id):
+        try:
+            unfollowed, followers_count = User.objects.unfollow(request.user.id, id)
+        except User.DoesNotExist:
+            raise NotFound()
+        detail = 'Unfollowed successfully.' if unfollowed else 'You do not follow this user.'
+        return Response({'detail': detail, 'following': False, 'followers': followers_count})
+
+class FollowListView(generics.ListAPIView):
+    """
+    Accounts on one side of a user's follow edges, newest first.
+
+    Pages are a range scan of a (user, id, other user) index on the follow
+    table plus primary-key lookups of the listed accounts.
+    """
+    serializer_class = UserSummarySerializer
+    pagination_class = FollowPagination
+    # Column holding the user in the URL, and the relation to list.
+    user_field = None
+    listed_field = None
+
+    def get_queryset(self):
+        listed = self.listed_field
+        return Follow.objects.filter(**{self.user_field: self.kwargs['id']}).select_related(listed).only(
+            f'{self.user_field}_id', *(f'{listed}__{name}' for name in UserSummarySerializer.Meta.fields)
+        )
+
+    def list(self, request, *args, **kwargs):
+        follows = self.paginate_queryset(self.get_queryset())
+        if not follows:
+            get_object_or_404(User, pk=self.kwargs['id'])
+        serializer = self.get_serializer([getattr(follow, self.listed_field) for follow in follows], many=True)
+        return self.get_paginated_response(serializer.data)
+
+class FollowersView(FollowListView):
+    user_field = 'from_user'
+    listed_field = 'to_user'
+
+class FollowingView(FollowListView):
+    user_field = 'to_user'
+    listed_field = 'from_user'
+
+class UserSuggestionsView(generics.ListAPIView):
+    """People you may know, precomputed by ``compute_suggestions``; one indexed query."""
+    serializer_class = UserSuggestionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return UserSuggestion.objects.filter(user_id=self.request.user.id).select_related('suggested').only(
+            'score', 'mutual_follows', 'shared_groups', 'suggested__id', 'suggested__username', 'suggested__firstname',
+            'suggested__lastname', 'suggested__avatar', 'suggested__university', 'suggested__major',
+        ).order_by('-score')
 
 class LogoutView(APIView):
 
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         
 
-class UserLoginView(APIView):
-    serializer_class = UserLoginSerializer
-    permission_classes = [AllowAny]
-
-    @method_decorator(csrf_exempt)
-    def post(self, request):
-        email = request.data.get('email')
-        password = request.data.get('password')
-
-        try:
-            user = User.objects.get(email=email)
-            if user.check_password(password):
-                refresh = RefreshToken.for_user(user)
-                return Response({
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                })
-            else:
-                return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+@csrf_exempt
+async def login_view(request):
+    """
+    Email/password login returning a JWT pair; served at both /api/token/ and
+    /api/users/login/. Async so that password hashing runs in its own bounded
+    pool (see ``login.verify_password``) instead of a request worker.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': 'Method not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+        email, password = data.get('email'), data.get('password')
+    except (ValueError, AttributeError):
+        return JsonResponse({'detail': 'Malformed request.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not email or not password:
+        return JsonResponse({'detail': 'Email and password are required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        tokens = await login.login(request, email, password)
+    except login.LoginThrottled as throttled:
+        response = JsonResponse({'detail': 'Too many login attempts.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(math.ceil(throttled.wait))
+        return response
+    except login.LoginBusy:
+        response = JsonResponse({'detail': 'Login is busy, try again.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
+    if tokens is None:
+        return JsonResponse({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+    return JsonResponse(tokens)
 
 class UserChangePasswordView(generics.UpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        return get_object_or_404(User, pk=self.request.user.pk)
 
     def perform_update(self, serializer):
         user = self.get_object()
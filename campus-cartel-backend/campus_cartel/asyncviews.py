@@ -0,0 +1,121 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .cache import CachedListMixin, CachedRetrieveMixin, acached_list, acached_object
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class AsyncReadView:
+    """
+    Serves JSON reads of a DRF view (``view_class``) natively async; every
+    other request runs the sync view in a worker thread as before.
+
+    The DRF view is still instantiated for its queryset, serializer,
+    paginator and permission classes, so both paths render the same data.
+    Authentication goes through the authenticators' ``aauthenticate`` when
+    they have one. Subclasses implement ``read(view, request)``, returning
+    the response data; it must not touch the database outside the async ORM.
+    Setting ``ASYNC_READ_VIEWS = False`` sends reads to the sync view too.
+    """
+    view_class = None
+
+    def __init__(self, **initkwargs):
+        self.initkwargs = initkwargs
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        sync_view = sync_to_async(cls.view_class.as_view(**initkwargs))
+
+        async def view(request, *args, **kwargs):
+            if request.method in READ_METHODS and getattr(settings, 'ASYNC_READ_VIEWS', True):
+                response = await cls(**initkwargs).dispatch(request, *args, **kwargs)
+                if response is not None:
+                    return response
+            return await sync_view(request, *args, **kwargs)
+
+        view.view_class = cls
+        view.cls = cls.view_class
+        view.initkwargs = initkwargs
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        view = self.view_class(**self.initkwargs)
+        view.setup(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        request = view.request = view.initialize_request(request, *args, **kwargs)
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+        try:
+            renderer, media_type = view.perform_content_negotiation(request)
+        except APIException:
+            renderer = None
+        if not isinstance(renderer, JSONRenderer):
+            # The browsable API renders forms from the database.
+            return None
+        request.accepted_renderer, request.accepted_media_type = renderer, media_type
+
+        try:
+            request.version, request.versioning_scheme = view.determine_version(request, *args, **kwargs)
+            await self.authenticate(request)
+            view.check_permissions(request)
+            view.check_throttles(request)
+            response = Response(await self.read(view, request))
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return view.finalize_response(request, response, *args, **kwargs).render()
+
+    async def authenticate(self, request):
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth = await authenticator.aauthenticate(request)
+            else:
+                user_auth = await sync_to_async(authenticator.authenticate)(request)
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+        request._not_authenticated()
+
+    async def read(self, view, request):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncReadView):
+    """``ListAPIView.list``, paginated with the paginator's ``apaginate_queryset``."""
+
+    async def read(self, view, request):
+        if isinstance(view, CachedListMixin):
+            return await acached_list(view.cache_namespace, request, lambda: self.list(view, request))
+        return await self.list(view, request)
+
+    async def list(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        if view.paginator is None:
+            return view.get_serializer([row async for row in queryset], many=True).data
+        page = await view.paginator.apaginate_queryset(queryset, request, view)
+        return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+
+class AsyncRetrieveView(AsyncReadView):
+    """``RetrieveAPIView.retrieve`` with the object loaded through ``aget``."""
+
+    async def read(self, view, request):
+        if isinstance(view, CachedRetrieveMixin):
+            pk = view.kwargs[view.lookup_url_kwarg or view.lookup_field]
+            return await acached_object(view.cache_namespace, pk, request, lambda: self.retrieve(view, request))
+        return await self.retrieve(view, request)
+
+    async def retrieve(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        view.check_object_permissions(request, instance)
+        return view.get_serializer(instance).data
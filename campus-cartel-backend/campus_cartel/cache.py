@@ -0,0 +1,206 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def is_shared_cache():
+    """
+    Whether every worker process sees the API cache. Local memory and dummy
+    caches don't, unless API_CACHE_SHARED says the deployment runs one process.
+    """
+    shared = getattr(settings, 'API_CACHE_SHARED', None)
+    if shared is not None:
+        return shared
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+def _record(namespace, outcome):
+    with _stats_lock:
+        _stats[namespace][outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return {namespace: dict(counts) for namespace, counts in _stats.items()}
+
+
+def _fresh_version():
+    # Versions start from the clock so that a version key evicted from the
+    # cache can never come back as a number that old entries still use.
+    return int(time.time() * 1000)
+
+
+def _version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+async def _aversion(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _fresh_version(), None)
+        version = await cache.aget(key, 0)
+    return version
+
+
+def _object_versions(namespace, pk):
+    # An object's entries are keyed on its own version and on the namespace's,
+    # which invalidate_namespace() bumps for every object at once.
+    keys = f'api:{namespace}:version', f'api:{namespace}:{pk}:version'
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                cache.add(key, _fresh_version(), None)
+        versions = cache.get_many(keys)
+    return '.'.join(str(versions.get(key, 0)) for key in keys)
+
+
+async def _aobject_versions(namespace, pk):
+    keys = f'api:{namespace}:version', f'api:{namespace}:{pk}:version'
+    cache = get_cache()
+    versions = await cache.aget_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                await cache.aadd(key, _fresh_version(), None)
+        versions = await cache.aget_many(keys)
+    return '.'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _fresh_version(), None)
+
+
+def _bump_now_and_on_commit(*keys):
+    # The second bump, after commit, stops a concurrent reader that cached the
+    # old rows in between from serving them.
+    def bump():
+        for key in keys:
+            _bump(key)
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def invalidate_object(namespace, pk):
+    """Drop every cached representation of one object and of its lists."""
+    _bump_now_and_on_commit(f'api:{namespace}:{pk}:version', f'api:{namespace}:list-version')
+
+
+def invalidate_lists(namespace):
+    _bump_now_and_on_commit(f'api:{namespace}:list-version')
+
+
+def invalidate_namespace(namespace):
+    """Drop every cached list and object of a namespace, e.g. when data they all embed changes."""
+    _bump_now_and_on_commit(f'api:{namespace}:version', f'api:{namespace}:list-version')
+
+
+def _primary_reads():
+    # Cached data must come from the primary: a lagging replica's rows could
+    # predate the write that bumped the version they would be cached under.
+    from .routers import primary_reads
+    return primary_reads()
+
+
+def _variant(request):
+    # Query parameters (cursor, page_size, filters...) select the variant.
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    return hashlib.md5(query.encode()).hexdigest()
+
+
+def _list_key(namespace, version, request):
+    return f'api:{namespace}:list:{version}:{_variant(request)}'
+
+
+def _object_key(namespace, pk, version, request):
+    return f'api:{namespace}:{pk}:{version}:{_variant(request)}'
+
+
+async def acached_list(namespace, request, build):
+    """``CachedListMixin`` for async views: the same keys, with ``build`` awaited on a miss."""
+    version = await _aversion(f'api:{namespace}:list-version')
+    return await _acached(namespace, _list_key(namespace, version, request), build)
+
+
+async def acached_object(namespace, pk, request, build):
+    """``CachedRetrieveMixin`` for async views."""
+    version = await _aobject_versions(namespace, pk)
+    return await _acached(namespace, _object_key(namespace, pk, version, request), build)
+
+
+async def _acached(namespace, key, build):
+    # Errors propagate out of build() and are never cached.
+    cache = get_cache()
+    data = await cache.aget(key)
+    if data is not None:
+        _record(namespace, 'hits')
+        return data
+    _record(namespace, 'misses')
+    with _primary_reads():
+        data = await build()
+    await cache.aset(key, data, getattr(settings, 'API_CACHE_TIMEOUT', 60))
+    return data
+
+
+class _CachedResponseMixin:
+    cache_namespace = None
+
+    def cached_response(self, key, build):
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            _record(self.cache_namespace, 'hits')
+            return Response(data)
+        _record(self.cache_namespace, 'misses')
+        with _primary_reads():
+            response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, getattr(settings, 'API_CACHE_TIMEOUT', 60))
+        return response
+
+
+class CachedListMixin(_CachedResponseMixin):
+    """Read-through cache for list views; every write to the namespace bumps the list version."""
+
+    def list(self, request, *args, **kwargs):
+        version = _version(f'api:{self.cache_namespace}:list-version')
+        key = _list_key(self.cache_namespace, version, request)
+        return self.cached_response(key, lambda: super(CachedListMixin, self).list(request, *args, **kwargs))
+
+
+class CachedRetrieveMixin(_CachedResponseMixin):
+    """Read-through cache for detail views, keyed per object."""
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        version = _object_versions(self.cache_namespace, pk)
+        key = _object_key(self.cache_namespace, pk, version, request)
+        return self.cached_response(key, lambda: super(CachedRetrieveMixin, self).retrieve(request, *args, **kwargs))
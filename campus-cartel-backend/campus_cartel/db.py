@@ -0,0 +1,25 @@
+from django.db import connections, router
+from django.db.models.constants import OnConflict
+from django.db.models.sql import InsertQuery
+
+
+def insert_ignore(model, using=None, **values):
+    """
+    Insert one row, silently skipping it if it violates a unique constraint.
+
+    Issues a single INSERT IGNORE / INSERT OR IGNORE / ON CONFLICT DO NOTHING
+    statement (whichever the backend speaks) and returns the number of rows
+    actually written, so callers can tell a new row from a duplicate without
+    reading first.
+    """
+    using = using or router.db_for_write(model)
+    obj = model(**values)
+    fields = [field for field in model._meta.local_concrete_fields if not field.primary_key]
+    query = InsertQuery(model, on_conflict=OnConflict.IGNORE)
+    query.insert_values(fields, [obj])
+    inserted = 0
+    with connections[using].cursor() as cursor:
+        for sql, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(sql, params)
+            inserted += max(cursor.rowcount, 0)
+    return inserted
@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.utils.deconstruct import deconstructible
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each rendition.
+RENDITIONS = {
+    'thumb': 160,
+    'medium': 640,
+    'full': 1600,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Sent with sender=<model>, pk=<pk>, field=<image field name> once an
+# instance's renditions have been written.
+renditions_ready = Signal()
+
+_executor = None
+
+
+@deconstructible
+class ImageUploadValidator:
+    """Rejects uploads that are too large in bytes or in decoded pixels."""
+
+    def __call__(self, file):
+        max_bytes = getattr(settings, 'MAX_IMAGE_UPLOAD_SIZE', 10 * 1024 * 1024)
+        if file.size > max_bytes:
+            raise ValidationError(f"Images may be at most {max_bytes // (1024 * 1024)} MB.")
+        # Uploads already went through forms.ImageField, which leaves the
+        # (header-only) PIL image on the file.
+        image = getattr(file, 'image', None)
+        if image is not None and image.width * image.height > getattr(settings, 'MAX_IMAGE_PIXELS', 40_000_000):
+            raise ValidationError("Image dimensions are too large.")
+
+    def __eq__(self, other):
+        return isinstance(other, ImageUploadValidator)
+
+
+def _render(image, edge, fmt):
+    copy = image.copy()
+    copy.thumbnail((edge, edge), Image.LANCZOS)
+    pil_format, options = FORMATS[fmt]
+    if pil_format == 'JPEG' and copy.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', copy.size, (255, 255, 255))
+        background.paste(copy, mask=copy.convert('RGBA').split()[-1])
+        copy = background
+    buffer = io.BytesIO()
+    copy.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def generate_renditions(model, pk, field_name, renditions_field):
+    """Write every rendition of one instance's image and record their names."""
+    instance = model.objects.filter(pk=pk).only('pk', field_name, renditions_field).first()
+    if instance is None:
+        return
+    image_file = getattr(instance, field_name)
+    if not image_file:
+        return
+
+    storage = image_file.storage
+    stem, _ = os.path.splitext(image_file.name)
+    renditions = {'source': image_file.name}
+    with image_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    for size, edge in RENDITIONS.items():
+        renditions[size] = {}
+        for fmt in FORMATS:
+            name = storage.save(f'renditions/{stem}_{size}.{fmt}', ContentFile(_render(image, edge, fmt)))
+            renditions[size][fmt] = name
+
+    # Only record the result if the image wasn't replaced meanwhile.
+    updated = model.objects.filter(pk=pk, **{field_name: image_file.name}).update(**{renditions_field: renditions})
+    if updated:
+        renditions_ready.send(sender=model, pk=pk, field=field_name)
+
+
+def _run(model, pk, field_name, renditions_field):
+    close_old_connections()
+    try:
+        generate_renditions(model, pk, field_name, renditions_field)
+    except Exception:
+        logger.exception("Generating renditions for %s %s failed", model._meta.label, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(model, pk, field_name, renditions_field):
+    global _executor
+    if getattr(settings, 'IMAGE_PIPELINE_EAGER', False):
+        generate_renditions(model, pk, field_name, renditions_field)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_PIPELINE_WORKERS', 2), thread_name_prefix='renditions'
+        )
+    _executor.submit(_run, model, pk, field_name, renditions_field)
+
+
+def register(model, field_name, renditions_field):
+    """Generate renditions off the request path whenever ``field_name`` changes."""
+
+    def image_saved(sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        image_file = getattr(instance, field_name)
+        renditions = getattr(instance, renditions_field) or {}
+        if not image_file:
+            if renditions:
+                model.objects.filter(pk=instance.pk).update(**{renditions_field: {}})
+            return
+        if renditions.get('source') != image_file.name:
+            pk = instance.pk
+            transaction.on_commit(lambda: schedule_renditions(model, pk, field_name, renditions_field))
+
+    post_save.connect(image_saved, sender=model, weak=False, dispatch_uid=f'renditions-{model._meta.label}-{field_name}')
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Rendition URLs by size and format, e.g. ``{"thumb": {"webp": url, "jpeg": url}}``."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for size in RENDITIONS:
+            names = (value or {}).get(size)
+            if not names:
+                continue
+            urls[size] = {}
+            for fmt, name in names.items():
+                url = default_storage.url(name)
+                urls[size][fmt] = request.build_absolute_uri(url) if request is not None else url
+        return urls
@@ -0,0 +1,263 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.module_loading import import_string
+
+from .cache import cache_stats
+
+logger = logging.getLogger('campus_cartel.performance')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+# Upper bounds of the histogram buckets, per observed value.
+BUCKETS = {
+    'duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'db_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    'serialize_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    'db_queries': (1, 2, 3, 5, 10, 20, 50, 100, 200),
+}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.serialize_time = 0.0
+        self._serialize_depth = 0
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self):
+        sql, count = self.statements.most_common(1)[0] if self.statements else ('', 0)
+        return sql if count > 1 else None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # Parameters are left out so that N+1 lookups count as duplicates.
+            self.statements[sql] += 1
+
+
+def current_metrics():
+    return _current.get()
+
+
+class InstrumentedSerializerMixin:
+    """Adds the time spent turning instances into primitives to the request's serialize time."""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        # Nested serializers run inside their parent's timing.
+        metrics._serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics._serialize_depth -= 1
+            if not metrics._serialize_depth:
+                metrics.serialize_time += time.perf_counter() - started
+
+
+class BaseExporter:
+    def observe(self, view, method, status, metrics):
+        raise NotImplementedError
+
+
+class PrometheusExporter(BaseExporter):
+    """Aggregates request histograms per URL name for the /metrics endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(lambda: {'buckets': None, 'sum': 0.0, 'count': 0})
+        self._requests = Counter()
+        self._duplicates = Counter()
+
+    def _observe_value(self, name, labels, value):
+        histogram = self._histograms[(name, labels)]
+        if histogram['buckets'] is None:
+            histogram['buckets'] = [0] * len(BUCKETS[name])
+        for index, bound in enumerate(BUCKETS[name]):
+            if value <= bound:
+                histogram['buckets'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    def observe(self, view, method, status, metrics):
+        labels = (view, method)
+        with self._lock:
+            self._requests[labels + (str(status),)] += 1
+            self._duplicates[labels] += metrics.duplicate_queries
+            self._observe_value('duration_seconds', labels, metrics.duration)
+            self._observe_value('db_seconds', labels, metrics.db_time)
+            self._observe_value('serialize_seconds', labels, metrics.serialize_time)
+            self._observe_value('db_queries', labels, metrics.queries)
+
+    def render(self):
+        lines = [
+            '# HELP http_requests_total Requests served, by URL name.',
+            '# TYPE http_requests_total counter',
+        ]
+        with self._lock:
+            for (view, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP http_request_duplicate_queries_total SQL statements repeated within a request.',
+                '# TYPE http_request_duplicate_queries_total counter',
+            ]
+            for (view, method), count in sorted(self._duplicates.items()):
+                lines.append(f'http_request_duplicate_queries_total{{view="{view}",method="{method}"}} {count}')
+
+            for name, bounds in BUCKETS.items():
+                metric = f'http_request_{name}'
+                lines += [f'# TYPE {metric} histogram']
+                for (observed, (view, method)), histogram in sorted(self._histograms.items()):
+                    if observed != name:
+                        continue
+                    labels = f'view="{view}",method="{method}"'
+                    for bound, count in zip(bounds, histogram['buckets']):
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram["sum"]:.6f}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram["count"]}')
+
+        lines += [
+            '# HELP api_cache_requests_total Read-through API cache lookups.',
+            '# TYPE api_cache_requests_total counter',
+        ]
+        for namespace, counts in sorted(cache_stats().items()):
+            for outcome in ('hits', 'misses'):
+                lines.append(f'api_cache_requests_total{{namespace="{namespace}",outcome="{outcome}"}} {counts[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+
+@lru_cache
+def get_exporters():
+    paths = getattr(settings, 'PERFORMANCE_METRICS_EXPORTERS', ['campus_cartel.metrics.PrometheusExporter'])
+    return [import_string(path)() for path in paths]
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+def server_timing(metrics):
+    return ', '.join([
+        f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+        f'dup;desc="{metrics.duplicate_queries} duplicate queries"',
+        f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+        f'total;dur={metrics.duration * 1000:.1f}',
+    ])
+
+
+def _instrument(stack, metrics):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics.record_query))
+
+
+class PerformanceMiddleware:
+    """
+    Times every request and counts the SQL it runs on any connection.
+
+    Results go out as a ``Server-Timing`` header, one log line on the
+    ``campus_cartel.performance`` logger and the configured exporters.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                _instrument(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        # Connections belong to the thread the request's sync (and async ORM)
+        # work runs in, so the wrappers are installed and removed there.
+        stack = ExitStack()
+        try:
+            await sync_to_async(_instrument)(stack, metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.duration = time.perf_counter() - metrics.started
+
+        view = _view_name(request)
+        response['Server-Timing'] = server_timing(metrics)
+        for exporter in get_exporters():
+            exporter.observe(view, request.method, response.status_code, metrics)
+
+        duplicates = metrics.duplicate_queries
+        threshold = getattr(settings, 'PERFORMANCE_DUPLICATE_QUERY_WARNING', 5)
+        level = logging.WARNING if duplicates >= threshold else logging.INFO
+        logger.log(
+            level,
+            'view=%s method=%s status=%s duration_ms=%.1f queries=%d db_ms=%.1f duplicates=%d serialize_ms=%.1f',
+            view, request.method, response.status_code, metrics.duration * 1000, metrics.queries,
+            metrics.db_time * 1000, duplicates, metrics.serialize_time * 1000,
+            extra={
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(metrics.duration * 1000, 1),
+                'queries': metrics.queries,
+                'db_ms': round(metrics.db_time * 1000, 1),
+                'duplicate_queries': duplicates,
+                'most_repeated_query': metrics.most_repeated() if duplicates else None,
+                'serialize_ms': round(metrics.serialize_time * 1000, 1),
+            },
+        )
+        return response
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'PERFORMANCE_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    body = ''.join(
+        exporter.render() for exporter in get_exporters() if isinstance(exporter, PrometheusExporter)
+    )
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,217 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-based pagination over a composite ordering such as (created_at, id).
+
+    The cursor is an opaque token holding the ordering values of the last row
+    on the page, so every page is a single index range scan with no OFFSET.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = queryset.order_by(*self.ordering)
+
+        def fetch(position, limit):
+            if position is not None:
+                return list(queryset.filter(self.seek_filter(position))[:limit])
+            return list(queryset[:limit])
+
+        return self.paginate_with(request, queryset.model, fetch)
+
+    def paginate_with(self, request, model, fetch):
+        """
+        Paginate rows produced by ``fetch(position, limit)``, which must return
+        up to ``limit`` rows of ``model`` that come after ``position`` in
+        ``self.ordering`` (or from the start when ``position`` is None).
+        """
+        position = self.start_page(request, model)
+        return self.end_page(fetch(position, self.page_size + 1))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, through the async ORM."""
+        queryset = queryset.order_by(*self.ordering)
+        position = self.start_page(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+        return self.end_page([row async for row in queryset[:self.page_size + 1]])
+
+    def start_page(self, request, model):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_link = None
+        self.previous_link = None
+        return self.decode_cursor(request, model)
+
+    def end_page(self, rows):
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_link = self.encode_cursor(self.get_position(rows[-1]))
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_position(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    def seek_filter(self, position):
+        # (a, b) after (x, y)  <=>  a > x OR (a = x AND b > y), with the
+        # comparison flipped for descending fields.
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {self.ordering[i].lstrip('-'): position[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        token = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.parse_cursor_value(model, name.lstrip('-'), value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_cursor_value(self, model, field, value):
+        return model._meta.get_field(field).to_python(value)
+
+
+class PostPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CommentPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('-date_joined', '-id')
+
+
+class StudyGroupPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class FollowPagination(KeysetPagination):
+    ordering = ('-id',)
+
+
+class MembershipPagination(KeysetPagination):
+    ordering = ('joined_at', 'id')
+    page_size = 50
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Pages over aggregated ``(doc_type, doc_id, score, rank)`` search rows.
+    They are ordered on the integer ``rank`` rather than the float ``score``
+    so that equal scores compare equal and fall through to the document.
+    """
+    ordering = ('-rank', 'doc_type', 'doc_id')
+
+    def get_position(self, row):
+        return [row[name.lstrip('-')] for name in self.ordering]
+
+    def parse_cursor_value(self, model, field, value):
+        if field == 'rank':
+            return int(value)
+        return model._meta.get_field(field).to_python(value)
+
+
+class MessagePagination(KeysetPagination):
+    """
+    Chat history in chronological order.
+
+    Besides the opaque cursor, clients can page around a known message with
+    ``?before=<id>`` (older messages) or ``?after=<id>`` (newer messages).
+    Message ids grow with their timestamps, so both modes seek on the id.
+    """
+    ordering = ('timestamp', 'id')
+    page_size = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        around = self.around_query(queryset, request)
+        if around is None:
+            return super().paginate_queryset(queryset, request, view)
+        return self.around_page(request, list(around))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        around = self.around_query(queryset, request)
+        if around is None:
+            return await super().apaginate_queryset(queryset, request, view)
+        return self.around_page(request, [row async for row in around])
+
+    def around_query(self, queryset, request):
+        """The rows to fetch for ``?before=``/``?after=``, or None for cursor pages."""
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+        if before is None and after is None:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_link = None
+        self.previous_link = None
+        try:
+            anchor = int(before if before is not None else after)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        if before is not None:
+            return queryset.filter(id__lt=anchor).order_by('-id')[:self.page_size + 1]
+        return queryset.filter(id__gt=anchor).order_by('id')[:self.page_size + 1]
+
+    def around_page(self, request, rows):
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if before is not None:
+            rows = rows[::-1]
+
+        url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        if rows:
+            if before is None or has_more:
+                self.previous_link = remove_query_param(replace_query_param(url, 'before', rows[0].id), 'after')
+            if after is None or has_more:
+                self.next_link = remove_query_param(replace_query_param(url, 'after', rows[-1].id), 'before')
+        return rows
@@ -0,0 +1,120 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from .cache import get_cache, is_shared_cache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Per request: whether reads may go to a replica. Requests set it in
+# ReplicaRoutingMiddleware; everything else (commands, workers, tests) reads
+# from the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def _replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads made inside the block to the primary."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _pin_key(request):
+    # The same token (or, without one, the same address) identifies the client
+    # before and after authentication runs.
+    client = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+    return f'db:pinned:{hashlib.md5(client.encode()).hexdigest()}'
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to a random replica while the current request allows it, and
+    everything else to the primary.
+
+    Any write, or an open transaction on the primary, moves the rest of the
+    request's reads to the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = _replicas()
+        if not replicas or not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _replica_reads.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests read from replicas, unless the client wrote within the
+    last DATABASE_REPLICA_PIN_SECONDS (read-your-writes).
+
+    The pin lives in the API cache, which must be shared by every worker:
+    otherwise a client's next read can land on a worker that never saw the pin.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if _replicas() and not is_shared_cache():
+            raise ImproperlyConfigured(
+                "Read replicas need a cache shared by every worker (e.g. Redis or Memcached) to pin clients "
+                "to the primary after a write; set API_CACHE_SHARED=true if the site runs in one process."
+            )
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        safe = request.method in SAFE_METHODS
+        token = _replica_reads.set(safe and bool(_replicas()) and not get_cache().get(_pin_key(request)))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if not safe and _replicas():
+            get_cache().set(_pin_key(request), True, getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5))
+        return response
+
+    async def __acall__(self, request):
+        # The async ORM runs queries in a copy of this context and copies the
+        # flag back, so a write still moves later reads to the primary.
+        safe = request.method in SAFE_METHODS
+        token = _replica_reads.set(safe and bool(_replicas()) and not await get_cache().aget(_pin_key(request)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if not safe and _replicas():
+            await get_cache().aset(_pin_key(request), True, getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5))
+        return response
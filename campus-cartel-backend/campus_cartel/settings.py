@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'apps.users',      # Custom app for users
     'apps.posts',      # Custom app for posts
     'apps.groups',     # Custom app for groups
+    'apps.search',     # Full-text search index
     'rest_framework_simplejwt',  # JWT Authentication
     'rest_framework.authtoken',  # Token Authentication
     'django.contrib.sites',  # For allauth
@@ -36,6 +37,8 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    'campus_cartel.metrics.PerformanceMiddleware',  # Server-Timing, query counts, /metrics
+    'campus_cartel.routers.ReplicaRoutingMiddleware',  # Safe reads on replicas, pinned after writes
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS Middleware
@@ -71,17 +74,62 @@ TEMPLATES = [
 # WSGI application
 WSGI_APPLICATION = 'campus_cartel.wsgi.application'
 
-# Database configuration
-DATABASES = {
+# Database configuration, from the environment. Under WSGI connections are
+# kept for DB_CONN_MAX_AGE seconds and checked before reuse, so requests don't
+# pay a connect + auth handshake each time. asgi.py defaults it to 0: async
+# requests run their queries on short-lived threads, each holding its own
+# connection, so persistent ones pile up; pool with DB_POOL (PostgreSQL) or an
+# external pooler such as pgbouncer instead.
+DATABASE_PRIMARY = {
+    'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
+    'NAME': config('DB_NAME', default='campus_cartel'),
+    'USER': config('DB_USER', default='root'),
+    'PASSWORD': config('DB_PASSWORD', default='Iso123mer356!'),
+    'HOST': config('DB_HOST', default='localhost'),
+    'PORT': config('DB_PORT', default='3306'),
+    'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+    'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    'OPTIONS': {},
+}
+if 'mysql' in DATABASE_PRIMARY['ENGINE']:
+    DATABASE_PRIMARY['OPTIONS'] = {
+        'charset': 'utf8mb4',
+        'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+        # Fewer gap locks for the INSERT IGNORE / conditional UPDATE counters.
+        'isolation_level': 'read committed',
+    }
+elif 'postgresql' in DATABASE_PRIMARY['ENGINE'] and config('DB_POOL', default=False, cast=bool):
+    # psycopg's pool replaces persistent connections.
+    DATABASE_PRIMARY['OPTIONS'] = {'pool': True}
+    DATABASE_PRIMARY['CONN_MAX_AGE'] = 0
+
+DATABASES = {'default': DATABASE_PRIMARY}
+# Read replicas: hosts for server databases, file names for SQLite (which is
+# how they are tried locally, with no replication between the files).
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, config('DB_REPLICAS', default='').split(','))):
+    alias = f'replica_{index + 1}'
+    location = {'NAME': replica} if 'sqlite' in DATABASE_PRIMARY['ENGINE'] else {'HOST': replica}
+    DATABASES[alias] = {**DATABASE_PRIMARY, **location, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['campus_cartel.routers.PrimaryReplicaRouter']
+# After a client writes, its reads stay on the primary this long so it sees
+# its own changes despite replication lag.
+DATABASE_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache used for API responses; local memory by default so it works offline.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'campus_cartel',  # Replace with your database name
-        'USER': 'root',           # Replace with your MySQL username
-        'PASSWORD': 'Iso123mer356!',  # Replace with your MySQL password
-        'HOST': 'localhost',      # Replace with your database host (e.g., localhost)
-        'PORT': '3306', 
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='campus-cartel'),
     }
 }
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=60, cast=int)
+# Whether the cache is shared by every worker process: 'auto' detects it from
+# the backend (local memory is per process). Security checks that rely on the
+# cache fall back to the database when it is not; set 'true' only for a
+# single-process deployment.
+API_CACHE_SHARED = {'auto': None, 'true': True, 'false': False}[config('API_CACHE_SHARED', default='auto').lower()]
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -110,6 +158,15 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded media (kept where uploads have always landed). Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are streamed to a
+# temporary file instead of being held in memory.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR))
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+MAX_IMAGE_UPLOAD_SIZE = config('MAX_IMAGE_UPLOAD_SIZE', default=10 * 1024 * 1024, cast=int)
+MAX_IMAGE_PIXELS = 40_000_000
+IMAGE_PIPELINE_WORKERS = config('IMAGE_PIPELINE_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -122,7 +179,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -142,4 +199,53 @@ ALLOWED_HOSTS = [
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
-]
\ No newline at end of file
+]
+# Real-time group chat. Swap for a cross-process backend when running more
+# than one ASGI worker.
+GROUP_CHAT_BROADCAST_BACKEND = 'apps.groups.broadcast.InMemoryBroadcast'
+# Accounts with at least this many followers have their posts merged into
+# home timelines when read instead of copied to every follower on write.
+TIMELINE_PULL_FOLLOWERS = config('TIMELINE_PULL_FOLLOWERS', default=5000, cast=int)
+# Background threads copying new posts into their followers' timelines.
+TIMELINE_FANOUT_WORKERS = config('TIMELINE_FANOUT_WORKERS', default=2, cast=int)
+# Serve the hot JSON reads (post list/detail, group messages, profile) from
+# async views (campus_cartel.asyncviews); False runs them on the sync views.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=True, cast=bool)
+
+# Per-request performance instrumentation (campus_cartel.metrics).
+PERFORMANCE_METRICS_EXPORTERS = ['campus_cartel.metrics.PrometheusExporter']
+PERFORMANCE_METRICS_ALLOWED_IPS = config('PERFORMANCE_METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')
+PERFORMANCE_DUPLICATE_QUERY_WARNING = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'campus_cartel.performance': {
+            'handlers': ['console'],
+            'level': config('PERFORMANCE_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+SIMPLE_JWT = {
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.ClaimsTokenRefreshSerializer',
+}
+# How long ClaimsJWTAuthentication keeps a user's row once a view needs it.
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Login throttling, as (attempts, per seconds): every attempt counts against
+# the client IP, failed ones also against the account. Counted in the cache, so
+# with the local-memory default the limits apply to each worker process.
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 60),
+    'account': (5, 300),
+}
+# Password hashing runs in its own pool; attempts beyond the workers plus the
+# queue get a 503 instead of tying up request workers.
+LOGIN_HASH_WORKERS = config('LOGIN_HASH_WORKERS', default=4, cast=int)
+LOGIN_HASH_QUEUE = 16
@@ -0,0 +1,98 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _param(request, name):
+    if request is None:
+        return None
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=a,b`` and ``?expand=x,y`` for model serializers.
+
+    ``expandable_fields`` maps a relation to the serializer used when it is
+    expanded; otherwise it is rendered as a primary key. Names in
+    ``optional_fields`` are left out unless expanded. Both parameters only
+    apply to the top-level serializer of a request; ``kept_fields`` are always
+    rendered.
+    ``prefetches`` maps computed fields to a function returning the
+    ``Prefetch`` they read from.
+    """
+    expandable_fields = {}
+    optional_fields = []
+    kept_fields = ('id',)
+    prefetches = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get('request')
+        expand = _param(request, 'expand') or set()
+        for name, serializer_class in self.expandable_fields.items():
+            if name in expand:
+                self.fields[name] = serializer_class(read_only=True)
+        for name in self.optional_fields:
+            if name not in expand:
+                self.fields.pop(name, None)
+        wanted = _param(request, 'fields')
+        if wanted:
+            for name in list(self.fields):
+                if name not in self.kept_fields and name not in wanted:
+                    self.fields.pop(name)
+
+
+def related_lookups(serializer):
+    """``(only, select_related, prefetch_related)`` needed to render ``serializer``'s fields."""
+    model = serializer.Meta.model
+    only, select, prefetch = {model._meta.pk.name}, [], []
+    for name, field in serializer.fields.items():
+        if name in getattr(serializer, 'prefetches', {}):
+            prefetch.append(serializer.prefetches[name]())
+            continue
+        source = field.source
+        if source == '*' or '.' in source:
+            return None
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            # Properties and methods can read anything.
+            return None
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+            nested = related_lookups(field)
+            if nested is None or nested[1] or nested[2]:
+                return None
+            select.append(source)
+            only.update(f'{source}__{column}' for column in nested[0])
+        elif model_field.many_to_many or model_field.one_to_many:
+            related = model_field.related_model
+            prefetch.append(Prefetch(source, queryset=related._default_manager.only(related._meta.pk.name)))
+        elif model_field.concrete:
+            only.add(source)
+        else:
+            return None
+    return only, select, prefetch
+
+
+def sparse_queryset(queryset, serializer):
+    """Narrow ``queryset`` to the columns and relations ``serializer`` renders."""
+    lookups = related_lookups(serializer)
+    if lookups is None:
+        return queryset
+    only, select, prefetch = lookups
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        # select_related() with no names would follow every foreign key.
+        queryset = queryset.select_related(*select)
+    return queryset.prefetch_related(*prefetch).only(*only)
+
+
+class SparseQuerysetMixin:
+    """Applies ``sparse_queryset`` for the request's ``?fields=``/``?expand=``."""
+
+    def filter_queryset(self, queryset):
+        return sparse_queryset(super().filter_queryset(queryset), self.get_serializer())
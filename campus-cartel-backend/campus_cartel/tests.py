@@ -1,2 +1,118 @@
-# Placeholder for user tests
-from django.test import TestCase
\ No newline at end of file
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from apps.users.models import User
+from rest_framework.response import Response
+from .cache import _CachedResponseMixin, acached_object, get_cache
+from .routers import ReplicaRoutingMiddleware
+from .throttling import RateLimit
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], API_CACHE_SHARED=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.factory = RequestFactory()
+
+    def route(self, method, write=False, **headers):
+        """The databases a request's read (and optional write) went to."""
+        seen = []
+
+        def view(request):
+            if write:
+                seen.append(router.db_for_write(User))
+            seen.append(router.db_for_read(User))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/', **headers)
+        ReplicaRoutingMiddleware(view)(request)
+        return seen
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.route('get'), ['replica_1'])
+        self.assertEqual(self.route('post'), ['default'])
+
+    def test_reads_after_a_write_use_the_primary(self):
+        self.assertEqual(self.route('get', write=True), ['default', 'default'])
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self.route('post', HTTP_AUTHORIZATION='Bearer writer')
+        self.assertEqual(self.route('get', HTTP_AUTHORIZATION='Bearer writer'), ['default'])
+        self.assertEqual(self.route('get', HTTP_AUTHORIZATION='Bearer someone-else'), ['replica_1'])
+
+    async def test_async_requests_route_the_same_way(self):
+        seen = []
+
+        async def view(request):
+            # The async ORM routes in a worker thread with a copy of the context.
+            seen.append(await sync_to_async(router.db_for_read)(User))
+            await sync_to_async(router.db_for_write)(User)
+            seen.append(await sync_to_async(router.db_for_read)(User))
+            return HttpResponse()
+
+        await ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(seen, ['replica_1', 'default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.route('get'), ['default'])
+
+    @override_settings(API_CACHE_SHARED=None)
+    def test_replicas_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+    def test_cache_is_filled_from_the_primary(self):
+        seen = []
+
+        def build():
+            seen.append(router.db_for_read(User))
+            return Response({'built': True})
+
+        def view(request):
+            _CachedResponseMixin().cached_response('api:test', build)
+            seen.append(router.db_for_read(User))
+            return HttpResponse()
+
+        ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(seen, ['default', 'replica_1'])
+
+    async def test_async_cache_is_filled_from_the_primary(self):
+        async def build():
+            return await sync_to_async(router.db_for_read)(User)
+
+        async def view(request):
+            self.assertEqual(await acached_object('test', 1, request, build), 'default')
+            return HttpResponse()
+
+        await ReplicaRoutingMiddleware(view)(self.factory.get('/'))
+
+
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_concurrent_requests_cannot_overshoot_the_limit(self):
+        limit = RateLimit('test', 5, 60)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            waits = list(pool.map(lambda _: limit.consume('client'), range(40)))
+        self.assertEqual(waits.count(0), 5)
+        self.assertGreater(limit.wait('client'), 0)
+        self.assertEqual(limit.wait('other client'), 0)
+
+    def test_previous_window_slides_out(self):
+        limit = RateLimit('test', 4, 60)
+        with mock.patch('campus_cartel.throttling.time.time', return_value=6000.0):
+            self.assertEqual([limit.consume('client') for _ in range(5)], [0, 0, 0, 0, 75.0])
+        # A quarter into the next window three quarters of the old count remain.
+        with mock.patch('campus_cartel.throttling.time.time', return_value=6075.0):
+            self.assertEqual(limit.consume('client'), 0)
+            self.assertEqual(limit.wait('client'), 15.0)
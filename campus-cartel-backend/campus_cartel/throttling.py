@@ -0,0 +1,68 @@
+import hashlib
+import time
+
+from .cache import get_cache
+
+
+class RateLimit:
+    """
+    At most ``limit`` requests per ``period`` seconds, as a sliding window:
+    the current window's count plus the previous one's, weighted by how much
+    of it still falls within the last ``period`` seconds.
+
+    Counts are kept in the API cache with ``add``/``incr``, which are atomic,
+    so concurrent requests cannot overshoot the limit. Every worker shares
+    them when the cache is shared (see ``is_shared_cache``); with a
+    local-memory cache each process counts on its own.
+    """
+
+    def __init__(self, scope, limit, period):
+        self.scope = scope
+        self.limit = limit
+        self.period = period
+
+    def key(self, ident, window):
+        digest = hashlib.md5(str(ident).encode()).hexdigest()
+        return f'throttle:{self.scope}:{digest}:{window}'
+
+    def _counts(self, ident, now):
+        """``(window, fraction of it elapsed, previous window's count, current count)``."""
+        window, offset = divmod(now, self.period)
+        window = int(window)
+        keys = self.key(ident, window - 1), self.key(ident, window)
+        counts = get_cache().get_many(keys)
+        return window, offset / self.period, counts.get(keys[0], 0), counts.get(keys[1], 0)
+
+    def _wait(self, fraction, previous, current):
+        """Seconds until one more request fits in the window, or 0."""
+        room = self.limit - 1
+        if current > room:
+            # Until this window is the previous one and enough of it slid out.
+            return (2 - fraction - room / current) * self.period
+        if previous * (1 - fraction) + current <= room:
+            return 0
+        return (1 - (room - current) / previous - fraction) * self.period
+
+    def wait(self, ident):
+        """Seconds until a request is allowed, without counting one."""
+        _, fraction, previous, current = self._counts(ident, time.time())
+        return self._wait(fraction, previous, current)
+
+    def consume(self, ident):
+        """Count a request; returns 0 if it is allowed or the seconds to wait."""
+        window, fraction, previous, _ = self._counts(ident, time.time())
+        cache, key = get_cache(), self.key(ident, window)
+        # Kept through the next window, where it is the previous one.
+        timeout = int(2 * self.period) + 1
+        cache.add(key, 0, timeout)
+        try:
+            current = cache.incr(key)
+        except ValueError:
+            # Evicted since the add.
+            cache.add(key, 1, timeout)
+            current = 1
+        wait = self._wait(fraction, previous, current - 1)
+        if wait:
+            # Refused requests don't count.
+            cache.decr(key)
+        return wait
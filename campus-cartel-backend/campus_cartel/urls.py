@@ -1,12 +1,19 @@
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
+from apps.users.views import login_view
+from .metrics import metrics_view
+from .views import CacheStatsView, HealthView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('apps.users.urls')),
     path('api/posts/', include('apps.posts.urls')),
     path('api/groups/', include('apps.groups.urls')),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/search/', include('apps.search.urls')),
+    path('api/token/', login_view, name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', metrics_view, name='metrics'),
+    path('health/', HealthView.as_view(), name='health'),
 ]
\ No newline at end of file
@@ -0,0 +1,34 @@
+from django.db import DatabaseError, connections
+from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .cache import cache_stats
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class HealthView(APIView):
+    """Liveness for load balancers: every configured database answers ``SELECT 1``."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        databases = {}
+        for connection in connections.all():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                databases[connection.alias] = 'ok'
+            except DatabaseError:
+                databases[connection.alias] = 'unavailable'
+        healthy = all(state == 'ok' for state in databases.values())
+        return Response(
+            {'status': 'ok' if healthy else 'degraded', 'databases': databases},
+            status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )